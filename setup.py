@@ -7,6 +7,15 @@ setup(
     author="AI Assistant",
     packages=find_packages(),
     package_dir={"": "src"},
+    py_modules=[
+        "main",
+        "config",
+        "automation_script",
+        "event_player",
+        "event_recorder",
+        "screen_capture",
+        "image_recognition",
+    ],
     install_requires=[
         "opencv-python>=4.5.0",
         "numpy>=1.19.0",
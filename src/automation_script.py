@@ -7,6 +7,7 @@ import os
 import time
 import json
 import logging
+from threading import Event
 from typing import Dict, List, Any, Callable, Optional, Union, Tuple
 import pyautogui
 
@@ -39,6 +40,9 @@ class AutomationScript:
         # 脚本执行状态
         self.running = False
         self.paused = False
+        self._stop_event = Event()
+        self._resume_event = Event()  # 未暂停时处于置位状态
+        self._resume_event.set()
         self.current_step = 0
         self.variables = {}  # 脚本变量
         self.loop_counters = {}  # 循环计数器
@@ -121,6 +125,8 @@ class AutomationScript:
         
         self.running = True
         self.paused = False
+        self._stop_event.clear()
+        self._resume_event.set()
         self.current_step = from_step
         self.variables = {}
         self.loop_counters = {}
@@ -131,7 +137,7 @@ class AutomationScript:
             while self.running and self.current_step < len(self.script_data["steps"]):
                 # 检查是否暂停
                 while self.paused and self.running:
-                    time.sleep(0.1)
+                    self._resume_event.wait()
                 
                 if not self.running:
                     break
@@ -189,20 +195,40 @@ class AutomationScript:
             self.running = False
     
     def stop_script(self) -> None:
-        """停止脚本执行"""
+        """停止脚本执行，正在进行的等待和回放会立即中断"""
         self.running = False
+        self._stop_event.set()
+        self._resume_event.set()  # 唤醒暂停中的脚本
+        
+        if self.player.playing:
+            self.player.stop_playback()
+        
         logger.info("脚本执行已停止")
     
     def pause_script(self) -> None:
         """暂停脚本执行"""
         self.paused = True
+        self._resume_event.clear()
         logger.info("脚本执行已暂停")
     
     def resume_script(self) -> None:
         """恢复脚本执行"""
         self.paused = False
+        self._resume_event.set()
         logger.info("脚本执行已恢复")
     
+    def _sleep(self, seconds: float) -> bool:
+        """
+        可被stop_script中断的等待
+        
+        参数:
+            seconds: 等待时间（秒）
+        
+        返回:
+            bool: 是否完整等待（被停止则返回False）
+        """
+        return not self._stop_event.wait(seconds)
+    
     def _execute_step(self, step: Dict[str, Any]) -> bool:
         """
         执行单个脚本步骤
@@ -267,7 +293,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -287,7 +313,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -306,7 +332,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -325,7 +351,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -348,7 +374,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -373,7 +399,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -396,7 +422,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -408,8 +434,7 @@ class AutomationScript:
         try:
             duration = self._resolve_value(step.get("duration", 1.0))
             logger.debug(f"等待 {duration} 秒")
-            time.sleep(duration)
-            return True
+            return self._sleep(duration)
         except Exception as e:
             logger.error(f"执行等待步骤失败: {str(e)}")
             return False
@@ -441,16 +466,16 @@ class AutomationScript:
                 logger.debug(f"开始回放录制: {file_name}")
                 self.player.start_playback(speed=speed)
                 
-                # 等待回放完成
-                while self.player.playing:
-                    time.sleep(0.1)
-                    if not self.running:
-                        self.player.stop_playback()
-                        break
+                # 回放开始前脚本已被停止时，stop_script不会停止这次回放
+                if not self.running:
+                    self.player.stop_playback()
+                
+                # 等待回放完成（stop_script会直接停止回放）
+                self.player.wait_for_playback()
                 
                 # 等待指定时间
                 if "wait_after" in step:
-                    time.sleep(step["wait_after"])
+                    self._sleep(step["wait_after"])
                 
                 return True
             else:
@@ -490,7 +515,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return True
         except Exception as e:
@@ -513,8 +538,8 @@ class AutomationScript:
                 logger.error(f"图像文件不存在: {image_path}")
                 return False
             
-            # 捕获屏幕
-            screenshot = self.screen_capture.capture()
+            # 捕获屏幕（复用缓冲区，直接得到BGR数组）
+            screenshot = self.screen_capture.capture_frame()
             
             # 设置匹配参数
             confidence = step.get("confidence", config.match_threshold)
@@ -539,7 +564,7 @@ class AutomationScript:
                 
                 # 等待指定时间
                 if "wait_after" in step:
-                    time.sleep(step["wait_after"])
+                    self._sleep(step["wait_after"])
                 
                 return True
             else:
@@ -560,8 +585,8 @@ class AutomationScript:
             # 解析变量
             text = self._resolve_value(text)
             
-            # 捕获屏幕
-            screenshot = self.screen_capture.capture()
+            # 捕获屏幕（复用缓冲区，直接得到BGR数组）
+            screenshot = self.screen_capture.capture_frame()
             
             # 设置匹配参数
             region = step.get("region", None)
@@ -585,7 +610,7 @@ class AutomationScript:
                 
                 # 等待指定时间
                 if "wait_after" in step:
-                    time.sleep(step["wait_after"])
+                    self._sleep(step["wait_after"])
                 
                 return True
             else:
@@ -623,7 +648,7 @@ class AutomationScript:
             
             # 等待指定时间
             if "wait_after" in step:
-                time.sleep(step["wait_after"])
+                self._sleep(step["wait_after"])
             
             return result.returncode == 0
         except Exception as e:
@@ -704,8 +729,8 @@ class AutomationScript:
             logger.error(f"图像文件不存在: {image_path}")
             return False
         
-        # 捕获屏幕
-        screenshot = self.screen_capture.capture()
+        # 捕获屏幕（复用缓冲区，直接得到BGR数组）
+        screenshot = self.screen_capture.capture_frame()
         
         # 设置匹配参数
         confidence = step.get("confidence", config.match_threshold)
@@ -725,8 +750,8 @@ class AutomationScript:
         # 解析变量
         text = self._resolve_value(text)
         
-        # 捕获屏幕
-        screenshot = self.screen_capture.capture()
+        # 捕获屏幕（复用缓冲区，直接得到BGR数组）
+        screenshot = self.screen_capture.capture_frame()
         
         # 设置匹配参数
         region = step.get("region", None)
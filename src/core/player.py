@@ -108,23 +108,10 @@ class InputPlayer:
         返回:
             bool: 是否成功开始回放
         """
-        if self.playing:
-            logger.warning("回放已经在进行中")
-            return False
-        
-        if not self.events:
-            logger.warning("没有可回放的事件")
+        if not self._prepare_playback(on_event, on_complete, speed):
             return False
         
         try:
-            with self.lock:
-                self.playing = True
-                self.paused = False
-                self.current_index = 0
-                self.on_event_callback = on_event
-                self.on_complete_callback = on_complete
-                self.speed = max(0.1, min(10.0, speed))  # 限制速度在0.1-10倍之间
-            
             # 创建回放线程
             self.play_thread = threading.Thread(target=self._playback_thread)
             self.play_thread.daemon = True
@@ -138,6 +125,62 @@ class InputPlayer:
             self.playing = False
             return False
     
+    def play_recording_sync(
+        self,
+        on_event: Optional[Callable[[InputEvent, int], None]] = None,
+        speed: float = 1.0
+    ) -> bool:
+        """
+        在调用线程中同步回放，直到回放结束才返回
+        
+        参数:
+            on_event: 事件回调函数，当回放事件时调用
+            speed: 回放速度倍率
+        
+        返回:
+            bool: 是否成功完成回放
+        """
+        if not self._prepare_playback(on_event, None, speed):
+            return False
+        
+        logger.info(f"开始同步回放，共 {len(self.events)} 个事件，速度: {self.speed}x")
+        return self._playback_thread()
+    
+    def _prepare_playback(
+        self,
+        on_event: Optional[Callable[[InputEvent, int], None]],
+        on_complete: Optional[Callable[[], None]],
+        speed: float
+    ) -> bool:
+        """
+        检查并初始化回放状态
+        
+        参数:
+            on_event: 事件回调函数
+            on_complete: 完成回调函数
+            speed: 回放速度倍率
+        
+        返回:
+            bool: 是否可以开始回放
+        """
+        if self.playing:
+            logger.warning("回放已经在进行中")
+            return False
+        
+        if not self.events:
+            logger.warning("没有可回放的事件")
+            return False
+        
+        with self.lock:
+            self.playing = True
+            self.paused = False
+            self.current_index = 0
+            self.on_event_callback = on_event
+            self.on_complete_callback = on_complete
+            self.speed = max(0.1, min(10.0, speed))  # 限制速度在0.1-10倍之间
+        
+        return True
+    
     def stop_playback(self) -> None:
         """停止回放"""
         if not self.playing:
@@ -181,8 +224,13 @@ class InputPlayer:
         
         logger.debug(f"设置回放速度: {self.speed}x")
     
-    def _playback_thread(self) -> None:
-        """回放线程"""
+    def _playback_thread(self) -> bool:
+        """
+        回放线程
+        
+        返回:
+            bool: 回放是否正常结束
+        """
         try:
             start_time = time.time()
             last_event_time = start_time
@@ -238,6 +286,7 @@ class InputPlayer:
                 self.on_complete_callback()
             
             logger.info("回放完成")
+            return True
         
         except Exception as e:
             logger.error(f"回放线程异常: {str(e)}")
@@ -245,6 +294,8 @@ class InputPlayer:
             with self.lock:
                 self.playing = False
                 self.paused = False
+            
+            return False
     
     def _play_event(self, event: InputEvent) -> None:
         """
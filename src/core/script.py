@@ -4,8 +4,10 @@
 """
 
 import os
+import sys
 import time
 import json
+import logging
 import threading
 from typing import List, Dict, Any, Optional, Tuple, Callable, Union
 from enum import Enum
@@ -21,9 +23,31 @@ from core.player import InputPlayer
 # 获取日志记录器
 logger = get_logger(__name__)
 
+# 尝试导入orjson库，用于更高效的JSON序列化
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
-class ScriptStepType(Enum):
-    """脚本步骤类型"""
+
+def _dumps(obj: Any) -> bytes:
+    """
+    将对象序列化为UTF-8编码的JSON字节串
+    
+    参数:
+        obj: 要序列化的对象
+    
+    返回:
+        bytes: JSON字节串
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+class ScriptStepType(str, Enum):
+    """脚本步骤类型（继承str，比较和哈希走原生字符串路径）"""
     CLICK = "click"                # 点击
     RIGHT_CLICK = "right_click"    # 右键点击
     DOUBLE_CLICK = "double_click"  # 双击
@@ -42,6 +66,12 @@ class ScriptStepType(Enum):
 class ScriptStep:
     """脚本步骤"""
     
+    # 长脚本会创建大量步骤对象，使用__slots__减少内存占用并加快属性访问
+    __slots__ = ("step_id", "step_type", "params", "description", "_child_steps")
+    
+    # 参数中可能嵌套子步骤字典的键（条件分支、循环体）
+    CHILD_STEP_KEYS = ("true_step", "false_step", "loop_step")
+    
     def __init__(
         self,
         step_id: str,
@@ -62,6 +92,27 @@ class ScriptStep:
         self.step_type = step_type
         self.params = params
         self.description = description
+        self._child_steps: Optional[Dict[str, Optional['ScriptStep']]] = None
+    
+    def get_child_step(self, key: str) -> Optional['ScriptStep']:
+        """
+        获取参数中嵌套的子步骤，首次访问时从字典转换并缓存
+        
+        参数:
+            key: 子步骤参数键，如 'true_step'、'loop_step'
+        
+        返回:
+            Optional[ScriptStep]: 子步骤对象，如果未指定则返回None
+        """
+        child_steps = self._child_steps
+        if child_steps is None:
+            child_steps = self._child_steps = {}
+        
+        if key not in child_steps:
+            data = self.params.get(key)
+            child_steps[key] = ScriptStep.from_dict(data) if data else None
+        
+        return child_steps[key]
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -88,10 +139,19 @@ class ScriptStep:
         返回:
             ScriptStep: 脚本步骤对象
         """
+        params = data["params"]
+        
+        # 驻留条件判断中的变量名，变量查找时哈希比较可直接走指针相等
+        condition_params = params.get("condition_params")
+        if isinstance(condition_params, dict):
+            variable_name = condition_params.get("variable_name")
+            if isinstance(variable_name, str):
+                condition_params["variable_name"] = sys.intern(variable_name)
+        
         return cls(
             data["id"],
             ScriptStepType(data["type"]),
-            data["params"],
+            params,
             data.get("description", "")
         )
 
@@ -213,6 +273,17 @@ class Script:
         返回:
             Dict[str, Any]: 脚本字典
         """
+        data = self._header_dict()
+        data["steps"] = [step.to_dict() for step in self.steps]
+        return data
+    
+    def _header_dict(self) -> Dict[str, Any]:
+        """
+        获取脚本元数据字典（不含步骤）
+        
+        返回:
+            Dict[str, Any]: 元数据字典
+        """
         return {
             "id": self.script_id,
             "name": self.name,
@@ -220,10 +291,29 @@ class Script:
             "author": self.author,
             "version": self.version,
             "created_at": self.created_at,
-            "updated_at": self.updated_at,
-            "steps": [step.to_dict() for step in self.steps]
+            "updated_at": self.updated_at
         }
     
+    def _write_json(self, f) -> None:
+        """
+        以流式方式将脚本写入JSON文件，逐个序列化步骤，
+        避免先构建包含全部步骤的完整字典
+        
+        参数:
+            f: 以二进制模式打开的文件对象
+        """
+        # 元数据部分去掉结尾的 '}'，后接步骤数组
+        f.write(_dumps(self._header_dict())[:-1])
+        f.write(b',"steps":[')
+        
+        for i, step in enumerate(self.steps):
+            if i:
+                f.write(b',')
+            f.write(b'\n')
+            f.write(_dumps(step.to_dict()))
+        
+        f.write(b'\n]}\n')
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Script':
         """
@@ -264,11 +354,22 @@ class Script:
         """
         try:
             # 确保目录存在
-            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+            save_dir = os.path.dirname(file_path)
+            os.makedirs(os.path.abspath(save_dir), exist_ok=True)
             
-            # 保存为JSON文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+            # 先写入临时文件再替换，避免保存中断时留下不完整的文件
+            tmp_path = file_path + ".tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    self._write_json(f)
+                os.replace(tmp_path, file_path)
+            except Exception:
+                # 写入失败时删除残留的临时文件
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
             
             logger.info(f"已保存脚本: {file_path}")
             return True
@@ -312,6 +413,8 @@ class Script:
 class ScriptExecutionResult:
     """脚本执行结果"""
     
+    __slots__ = ("success", "message", "step_id", "step_index", "data")
+    
     def __init__(
         self,
         success: bool,
@@ -358,6 +461,9 @@ class ScriptExecutor:
         # 线程锁
         self.lock = threading.Lock()
         
+        # 停止事件，用于中断等待步骤
+        self._stop_event = threading.Event()
+        
         # 工具
         self.screen_capture = ScreenCapture()
         self.input_player = InputPlayer()
@@ -365,6 +471,26 @@ class ScriptExecutor:
         # 变量存储
         self.variables = {}
         
+        # 注释步骤和零时长等待的执行结果按 (消息, 步骤ID, 步骤索引) 缓存，循环中重复执行时不再创建对象；
+        # 调用方不得修改这些结果（包括其data字典）
+        self._static_results: Dict[Tuple[str, Optional[str], Optional[int]], ScriptExecutionResult] = {}
+        
+        # 步骤类型到执行方法的分发表
+        self._step_handlers: Dict[ScriptStepType, Callable[[ScriptStep], ScriptExecutionResult]] = {
+            ScriptStepType.CLICK: self._execute_click,
+            ScriptStepType.RIGHT_CLICK: self._execute_right_click,
+            ScriptStepType.DOUBLE_CLICK: self._execute_double_click,
+            ScriptStepType.MOVE: self._execute_move,
+            ScriptStepType.TYPE: self._execute_type,
+            ScriptStepType.KEY: self._execute_key,
+            ScriptStepType.WAIT: self._execute_wait,
+            ScriptStepType.FIND_IMAGE: self._execute_find_image,
+            ScriptStepType.FIND_TEXT: self._execute_find_text,
+            ScriptStepType.EXECUTE: self._execute_recording,
+            ScriptStepType.CONDITION: self._execute_condition,
+            ScriptStepType.LOOP: self._execute_loop,
+        }
+        
         logger.debug("脚本执行器已初始化")
     
     def load_script(self, script: Script) -> None:
@@ -374,12 +500,53 @@ class ScriptExecutor:
         参数:
             script: 脚本对象
         """
+        # 预先转换嵌套的子步骤，避免在条件/循环执行时重复构建
+        for step in script.steps:
+            self._prepare_child_steps(step)
+        
         with self.lock:
             self.script = script
             self.current_step_index = 0
+            self._static_results.clear()
         
         logger.debug(f"已加载脚本: {script.name}")
     
+    def _static_result(self, message: str, step_id: Optional[str], step_index: Optional[int] = None) -> ScriptExecutionResult:
+        """
+        获取（或创建并缓存）不随执行变化的成功结果
+        
+        参数:
+            message: 结果消息
+            step_id: 步骤ID
+            step_index: 步骤索引
+        
+        返回:
+            ScriptExecutionResult: 共享的执行结果
+        """
+        key = (message, step_id, step_index)
+        result = self._static_results.get(key)
+        if result is None:
+            result = self._static_results[key] = ScriptExecutionResult(True, message, step_id, step_index)
+        return result
+    
+    def _prepare_child_steps(self, step: ScriptStep) -> None:
+        """
+        递归转换并缓存步骤中嵌套的子步骤
+        
+        参数:
+            step: 脚本步骤
+        """
+        for key in ScriptStep.CHILD_STEP_KEYS:
+            try:
+                child_step = step.get_child_step(key)
+            except Exception as e:
+                # 转换失败的子步骤留到执行时再报告错误
+                logger.warning(f"步骤 {step.step_id} 的子步骤 {key} 无效: {str(e)}")
+                continue
+            
+            if child_step is not None:
+                self._prepare_child_steps(child_step)
+    
     def execute(
         self,
         on_step_start: Optional[Callable[[ScriptStep, int], None]] = None,
@@ -418,6 +585,7 @@ class ScriptExecutor:
                 self.on_step_complete = on_step_complete
                 self.on_script_complete = on_script_complete
                 self.variables = {}
+                self._stop_event.clear()
             
             # 创建执行线程
             self.execute_thread = threading.Thread(target=self._execute_thread)
@@ -440,6 +608,7 @@ class ScriptExecutor:
         with self.lock:
             self.executing = False
             self.paused = False
+            self._stop_event.set()
         
         logger.info("停止执行脚本")
     
@@ -538,37 +707,19 @@ class ScriptExecutor:
             ScriptExecutionResult: 执行结果
         """
         try:
-            logger.debug(f"执行步骤 {step_index + 1}: {step.step_type.value}")
+            # 热路径：仅在启用调试级别时才格式化日志
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("执行步骤 %d: %s", step_index + 1, step.step_type.value)
             
             # 根据步骤类型执行
-            if step.step_type == ScriptStepType.CLICK:
-                return self._execute_click(step)
-            elif step.step_type == ScriptStepType.RIGHT_CLICK:
-                return self._execute_right_click(step)
-            elif step.step_type == ScriptStepType.DOUBLE_CLICK:
-                return self._execute_double_click(step)
-            elif step.step_type == ScriptStepType.MOVE:
-                return self._execute_move(step)
-            elif step.step_type == ScriptStepType.TYPE:
-                return self._execute_type(step)
-            elif step.step_type == ScriptStepType.KEY:
-                return self._execute_key(step)
-            elif step.step_type == ScriptStepType.WAIT:
-                return self._execute_wait(step)
-            elif step.step_type == ScriptStepType.FIND_IMAGE:
-                return self._execute_find_image(step)
-            elif step.step_type == ScriptStepType.FIND_TEXT:
-                return self._execute_find_text(step)
-            elif step.step_type == ScriptStepType.EXECUTE:
-                return self._execute_recording(step)
-            elif step.step_type == ScriptStepType.CONDITION:
-                return self._execute_condition(step)
-            elif step.step_type == ScriptStepType.LOOP:
-                return self._execute_loop(step)
-            elif step.step_type == ScriptStepType.COMMENT:
-                return ScriptExecutionResult(True, "注释步骤", step.step_id, step_index)
-            else:
+            if step.step_type is ScriptStepType.COMMENT:
+                return self._static_result("注释步骤", step.step_id, step_index)
+            
+            handler = self._step_handlers.get(step.step_type)
+            if handler is None:
                 return ScriptExecutionResult(False, f"未知步骤类型: {step.step_type.value}", step.step_id, step_index)
+            
+            return handler(step)
         
         except Exception as e:
             logger.error(f"执行步骤失败: {str(e)}")
@@ -730,9 +881,12 @@ class ScriptExecutor:
         try:
             # 获取参数
             seconds = step.params.get("seconds", 1.0)
+            if seconds == 0:
+                return self._static_result("等待 0 秒", step.step_id)
             
-            # 执行等待
-            time.sleep(seconds)
+            # 执行等待，停止执行时立即返回；停止不算步骤失败，由执行循环的停止检查结束执行
+            if self._stop_event.wait(seconds):
+                return ScriptExecutionResult(True, "等待被停止", step.step_id)
             
             return ScriptExecutionResult(True, f"等待 {seconds} 秒", step.step_id)
         
@@ -866,16 +1020,9 @@ class ScriptExecutor:
             if not self.input_player.load_recording(recording_path):
                 return ScriptExecutionResult(False, f"加载录制文件失败: {recording_path}", step.step_id)
             
-            # 回放录制
-            completed = threading.Event()
-            
-            def on_complete():
-                completed.set()
-            
-            self.input_player.start_playback(on_complete=on_complete, speed=speed)
-            
-            # 等待回放完成
-            completed.wait()
+            # 在执行线程中同步回放录制
+            if not self.input_player.play_recording_sync(speed=speed):
+                return ScriptExecutionResult(False, f"回放录制失败: {recording_path}", step.step_id)
             
             return ScriptExecutionResult(True, f"执行录制: {recording_path}", step.step_id)
         
@@ -896,8 +1043,6 @@ class ScriptExecutor:
             # 获取参数
             condition_type = step.params.get("condition_type", "")
             condition_params = step.params.get("condition_params", {})
-            true_step = step.params.get("true_step")
-            false_step = step.params.get("false_step")
             
             # 执行条件判断
             condition_result = False
@@ -940,13 +1085,13 @@ class ScriptExecutor:
             
             # 根据条件结果执行相应步骤
             if condition_result:
-                if true_step:
-                    true_step_obj = ScriptStep.from_dict(true_step)
+                true_step_obj = step.get_child_step("true_step")
+                if true_step_obj:
                     return self._execute_step(true_step_obj, -1)
                 return ScriptExecutionResult(True, "条件为真，无操作", step.step_id)
             else:
-                if false_step:
-                    false_step_obj = ScriptStep.from_dict(false_step)
+                false_step_obj = step.get_child_step("false_step")
+                if false_step_obj:
                     return self._execute_step(false_step_obj, -1)
                 return ScriptExecutionResult(True, "条件为假，无操作", step.step_id)
         
@@ -967,14 +1112,12 @@ class ScriptExecutor:
             # 获取参数
             loop_type = step.params.get("loop_type", "")
             loop_params = step.params.get("loop_params", {})
-            loop_step = step.params.get("loop_step")
+            loop_step_obj = step.get_child_step("loop_step")
             
             # 检查循环步骤
-            if not loop_step:
+            if not loop_step_obj:
                 return ScriptExecutionResult(False, "未指定循环步骤", step.step_id)
             
-            loop_step_obj = ScriptStep.from_dict(loop_step)
-            
             # 执行循环
             if loop_type == "count":
                 # 计数循环
@@ -1026,9 +1169,11 @@ class ScriptExecutor:
                             step.step_id
                         )
                     
-                    # 检查图像
+                    # 检查图像：每次迭代只截取一次指定区域，再在该截图中匹配
+                    screenshot = self.screen_capture.capture(region)
                     image_result = self.screen_capture.find_image(
                         image_path,
+                        screenshot=screenshot,
                         threshold=threshold,
                         region=region
                     )
@@ -1075,9 +1220,11 @@ class ScriptExecutor:
                             step.step_id
                         )
                     
-                    # 检查文本
+                    # 检查文本：每次迭代只截取一次指定区域，再在该截图中识别
+                    screenshot = self.screen_capture.capture(region)
                     text_result = self.screen_capture.find_text(
                         text,
+                        screenshot=screenshot,
                         lang=lang,
                         region=region
                     )
@@ -4,12 +4,16 @@
 """
 
 import os
+import sys
 import time
 import json
 import logging
-from typing import Dict, List, Optional, Tuple, Any, Callable
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any, Callable, ClassVar, Iterator
 from threading import Thread, Event
 
+import cv2
+import numpy as np
 import pyautogui
 from PIL import Image
 
@@ -19,6 +23,68 @@ from screen_capture import ScreenCapture
 
 logger = logging.getLogger('EventPlayer')
 
+# 尝试导入orjson库，用于更高效的JSON解析
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 尝试导入ijson库，用于增量解析大型录制文件
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# 尝试导入numba库，用于编译鼠标移动事件合并的计算内核
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _simplify_mouse_moves(times, xs, ys, is_move, min_interval, tolerance):
+        """
+        计算鼠标移动事件合并后需要保留的事件掩码
+        
+        规则与EventPlayer._coalesce_mouse_move_events的纯Python实现一致
+        """
+        count = len(times)
+        keep = np.ones(count, np.bool_)
+        last = -1  # 当前移动段中最后保留的移动事件索引
+        
+        for i in range(count):
+            if not is_move[i]:
+                last = -1
+                continue
+            
+            # 移动段的第一个点和最后一个点必须保留
+            if last < 0 or i + 1 >= count or not is_move[i + 1]:
+                last = i
+                continue
+            
+            # 距离上一个保留点时间过短，跳过
+            if times[i] - times[last] < min_interval:
+                keep[i] = False
+                continue
+            
+            # 与上一个保留点和下一个点近似共线，跳过
+            acx = xs[i + 1] - xs[last]
+            acy = ys[i + 1] - ys[last]
+            abx = xs[i] - xs[last]
+            aby = ys[i] - ys[last]
+            cross = abs(acx * aby - acy * abx)
+            if cross < tolerance * np.sqrt(acx * acx + acy * acy):
+                keep[i] = False
+                continue
+            
+            last = i
+        
+        return keep
+
 class EventPlayer:
     """事件播放器类，回放记录的鼠标和键盘操作"""
     
@@ -28,19 +94,45 @@ class EventPlayer:
         self.playing = False
         self.paused = False
         self._stop_event = Event()
+        self._resume_event = Event()  # 未暂停时处于置位状态
+        self._resume_event.set()
+        self._finished_event = Event()  # 没有正在进行的回放时处于置位状态
+        self._finished_event.set()
+        self._wake_event = Event()  # 停止或调整速度时唤醒正在等待下一个事件的回放线程
+        self._pending_speed: Optional[float] = None  # 回放中最近一次设置的速度，由回放线程在下一个事件前应用
         
         # 事件列表
         self.events: List[Dict[str, Any]] = []
+        self._targets: List[float] = []  # 每个事件相对于回放开始的目标时间（秒），在开始回放时预先计算
         
         # 播放线程
         self.playback_thread = None
         
+        # 回放过程中鼠标的最后位置，用于跳过位置不变的移动事件
+        self._last_pos: Tuple[int, int] = (-1, -1)
+        
+        # 回放过程中当前按住的鼠标按钮
+        self._held_buttons: set = set()
+        
         # 播放配置
         self.speed = config.get("playback.default_speed", 1.0)
         self.retry_attempts = config.get("playback.retry_attempts", 3)
         self.retry_delay = config.get("playback.retry_delay", 1.0)
         self.wait_for_images = config.get("playback.wait_for_images", True)
         
+        # 回放时将连续的鼠标移动合并为平滑移动（默认关闭）；按住鼠标按钮时（拖拽、滑动）从不合并，
+        # 每段最长batch_max_duration秒（按录制时间），段之间检查停止和暂停
+        self.batch_mouse_moves = config.get("playback.batch_mouse_moves", False)
+        self.batch_max_duration = config.get("playback.batch_max_duration", 0.1)
+        
+        # 鼠标移动事件合并配置
+        self.coalesce_mouse_moves = config.get("playback.coalesce_mouse_moves", True)
+        self.mouse_move_rate = config.get("playback.mouse_move_rate", 60)  # 每秒最多回放的移动事件数
+        self.mouse_move_tolerance = config.get("playback.mouse_move_tolerance", 2)  # 共线判定容差（像素）
+        
+        # 落后于时间表超过该值（秒）的鼠标移动事件将被跳过，以便追上进度
+        self.max_move_lateness = config.get("playback.max_move_lateness", 0.05)
+        
         # 图像识别和屏幕捕获
         self.image_recognition = ImageRecognition()
         self.screen_capture = ScreenCapture()
@@ -51,8 +143,31 @@ class EventPlayer:
         self.on_pause = None
         self.on_resume = None
         self.on_event = None
+        self.on_progress = None  # (已完成事件数, 总事件数)，每执行一批事件调用一次
         self.on_error = None
     
+    def get_recordings_list(self) -> List[str]:
+        """
+        获取录制目录中的录制文件列表
+        
+        使用os.scandir遍历目录，文件的修改时间随目录项一起返回，无需逐个调用os.stat
+        
+        返回:
+            List[str]: 录制文件名列表，按修改时间从新到旧排列
+        """
+        try:
+            with os.scandir(config.recordings_path) as it:
+                entries = [
+                    entry for entry in it
+                    if entry.is_file() and entry.name.endswith((".json", ".jsonl"))
+                ]
+            
+            entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            return [entry.name for entry in entries]
+        except Exception as e:
+            logger.error(f"获取录制列表失败: {str(e)}")
+            return []
+    
     def load_recording(self, file_path: str) -> bool:
         """
         加载录制文件
@@ -64,21 +179,148 @@ class EventPlayer:
             bool: 是否成功加载
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                recording_data = json.load(f)
+            events = []
             
-            # 验证数据格式
-            if "events" not in recording_data:
-                logger.error("无效的录制文件格式")
-                return False
+            for event in self.iter_recording_events(file_path):
+                # 驻留事件类型字符串，分发查找时可直接走指针相等
+                event_type = event.get("type")
+                if isinstance(event_type, str):
+                    event["type"] = sys.intern(event_type)
+                events.append(event)
+            
+            self.events = events
+            
+            # 合并连续的鼠标移动事件
+            if self.coalesce_mouse_moves:
+                original_count = len(self.events)
+                self.events = self._coalesce_mouse_move_events(self.events)
+                logger.debug(f"合并鼠标移动事件: {original_count} -> {len(self.events)}")
             
-            self.events = recording_data["events"]
             logger.info(f"已加载录制文件: {file_path}")
             return True
         except Exception as e:
             logger.error(f"加载录制文件失败: {str(e)}")
             return False
     
+    def iter_recording_events(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐个读取录制文件中的事件
+        
+        JSONL文件按行解析；JSON文件在安装了ijson时增量解析events数组，
+        不需要先把整个文件读入内存，否则整体解析后逐个返回。
+        
+        参数:
+            file_path: 录制文件路径
+        
+        返回:
+            Iterator[Dict[str, Any]]: 事件迭代器
+        """
+        if file_path.endswith('.jsonl'):
+            # 自动保存的JSONL文件，每行一个事件
+            yield from self._iter_jsonl_events(file_path)
+        elif IJSON_AVAILABLE:
+            with open(file_path, 'rb') as f:
+                yield from ijson.items(f, 'events.item', use_float=True)
+        else:
+            if ORJSON_AVAILABLE:
+                with open(file_path, 'rb') as f:
+                    recording_data = orjson.loads(f.read())
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    recording_data = json.load(f)
+            
+            # 验证数据格式
+            if "events" not in recording_data:
+                raise ValueError("无效的录制文件格式")
+            
+            yield from recording_data["events"]
+    
+    def _iter_jsonl_events(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐行读取JSONL格式的事件文件
+        
+        参数:
+            file_path: 文件路径
+        
+        返回:
+            Iterator[Dict[str, Any]]: 事件迭代器
+        """
+        loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+        
+        with open(file_path, 'rb') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                
+                try:
+                    yield loads(line)
+                except ValueError:
+                    # 录制中断时最后一行可能不完整
+                    logger.warning(f"跳过无法解析的事件行: {file_path}")
+    
+    def _coalesce_mouse_move_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        合并连续的鼠标移动事件
+        
+        每段连续移动中保留第一个和最后一个点，中间的点按最大回放频率抽稀，
+        并去掉与前后点近似共线的点。回放按事件的绝对时间计算等待，
+        因此删除中间点不影响其余事件的时序。
+        
+        参数:
+            events: 事件列表
+        
+        返回:
+            List[Dict[str, Any]]: 合并后的事件列表
+        """
+        min_interval = 1.0 / self.mouse_move_rate if self.mouse_move_rate > 0 else 0.0
+        tolerance = self.mouse_move_tolerance
+        
+        # 安装了numba时使用编译后的内核
+        if NUMBA_AVAILABLE and events:
+            times = np.array([event.get("time", 0.0) for event in events], dtype=np.float64)
+            xs = np.array([event.get("x", 0) for event in events], dtype=np.float64)
+            ys = np.array([event.get("y", 0) for event in events], dtype=np.float64)
+            is_move = np.array([event.get("type") == "mouse_move" for event in events], dtype=np.bool_)
+            
+            keep = _simplify_mouse_moves(times, xs, ys, is_move, float(min_interval), float(tolerance))
+            return [event for event, kept in zip(events, keep.tolist()) if kept]
+        
+        result = []
+        last_kept = None  # 当前移动段中最后保留的移动事件
+        count = len(events)
+        
+        for i, event in enumerate(events):
+            if event.get("type") != "mouse_move":
+                result.append(event)
+                last_kept = None
+                continue
+            
+            next_event = events[i + 1] if i + 1 < count else None
+            
+            # 移动段的第一个点和最后一个点（最终位置）必须保留
+            if last_kept is None or next_event is None or next_event.get("type") != "mouse_move":
+                result.append(event)
+                last_kept = event
+                continue
+            
+            # 距离上一个保留点时间过短，跳过
+            if event["time"] - last_kept["time"] < min_interval:
+                continue
+            
+            # 与上一个保留点和下一个点近似共线，跳过
+            ax, ay = last_kept["x"], last_kept["y"]
+            acx, acy = next_event["x"] - ax, next_event["y"] - ay
+            abx, aby = event["x"] - ax, event["y"] - ay
+            cross = abs(acx * aby - acy * abx)
+            if cross < tolerance * (acx * acx + acy * acy) ** 0.5:
+                continue
+            
+            result.append(event)
+            last_kept = event
+        
+        return result
+    
     def start_playback(self, speed: float = None) -> bool:
         """
         开始回放
@@ -102,12 +344,20 @@ class EventPlayer:
             if speed is not None:
                 self.speed = speed
             
+            # 一次性计算所有事件的目标时间，回放循环中只需按索引读取
+            times = np.fromiter((event["time"] for event in self.events), dtype=np.float64, count=len(self.events))
+            self._targets = (times / self.speed).tolist()
+            
             # 重置状态
             self.playing = True
             self.paused = False
             self._stop_event.clear()
+            self._resume_event.set()
+            self._pending_speed = None
+            self._wake_event.clear()
             
             # 启动回放线程
+            self._finished_event.clear()
             self.playback_thread = Thread(target=self._playback_loop)
             self.playback_thread.daemon = True
             self.playback_thread.start()
@@ -122,6 +372,7 @@ class EventPlayer:
         except Exception as e:
             logger.error(f"启动播放器失败: {str(e)}")
             self.stop_playback()
+            self._finished_event.set()
             return False
     
     def stop_playback(self) -> bool:
@@ -137,6 +388,8 @@ class EventPlayer:
         try:
             # 设置停止标志
             self._stop_event.set()
+            self._resume_event.set()  # 唤醒处于暂停状态的回放线程
+            self._wake_event.set()
             self.playing = False
             
             # 等待回放线程结束
@@ -166,6 +419,8 @@ class EventPlayer:
             return False
         
         self.paused = True
+        self._resume_event.clear()
+        self._wake_event.set()  # 唤醒正在等待下一个事件的回放线程，立即进入暂停
         logger.info("暂停回放")
         
         # 调用回调函数
@@ -185,6 +440,7 @@ class EventPlayer:
             return False
         
         self.paused = False
+        self._resume_event.set()
         logger.info("恢复回放")
         
         # 调用回调函数
@@ -193,45 +449,130 @@ class EventPlayer:
         
         return True
     
+    def set_speed(self, speed: float) -> bool:
+        """
+        设置回放速度，回放过程中调用时从当前进度开始按新速度继续
+        
+        参数:
+            speed: 回放速度
+        
+        返回:
+            bool: 是否设置成功
+        """
+        if speed <= 0:
+            logger.error(f"无效的回放速度: {speed}")
+            return False
+        
+        if not self.playing:
+            self.speed = speed
+            return True
+        
+        # 时间表由回放线程持有，交给它在下一个事件前重新计算
+        self._pending_speed = speed
+        self._wake_event.set()
+        logger.info(f"调整回放速度: {speed}")
+        return True
+    
     def _playback_loop(self) -> None:
         """回放循环"""
+        # 事件之间的间隔已记录在事件时间中，回放期间关闭pyautogui每次调用后的固定暂停
+        saved_timing = (pyautogui.PAUSE, pyautogui.MINIMUM_DURATION, pyautogui.MINIMUM_SLEEP)
+        
         try:
             # 设置安全模式
             pyautogui.FAILSAFE = True
+            pyautogui.PAUSE = 0
+            pyautogui.MINIMUM_DURATION = 0
+            pyautogui.MINIMUM_SLEEP = 0
             
-            # 初始化时间
-            start_time = time.time()
-            last_event_time = 0
+            # 鼠标可能在两次回放之间被移动过，重新开始时不沿用上次的位置
+            self._last_pos = (-1, -1)
+            self._held_buttons = set()
+            
+            # 初始化时间，所有事件都按相对于开始时间的绝对时间表执行，避免累积误差
+            start_time = time.monotonic()
             
             # 遍历事件
-            for i, event in enumerate(self.events):
+            events = self.events
+            targets = self._targets
+            count = len(events)
+            i = 0
+            while i < count:
                 # 检查是否停止
                 if self._stop_event.is_set():
                     break
                 
-                # 检查是否暂停
-                while self.paused and not self._stop_event.is_set():
-                    time.sleep(0.1)
+                # 检查是否暂停，暂停的时长从时间表中扣除
+                if self.paused:
+                    pause_time = time.monotonic()
+                    while self.paused and not self._stop_event.is_set():
+                        self._resume_event.wait()
+                    start_time += time.monotonic() - pause_time
                 
+                # 先清除唤醒标志再检查停止，停止时总会先置位停止标志
+                self._wake_event.clear()
                 if self._stop_event.is_set():
                     break
                 
+                # 回放中调整了速度，按新速度缩放时间表，并保持当前的录制进度不变
+                new_speed = self._pending_speed
+                if new_speed is not None and new_speed != self.speed:
+                    ratio = self.speed / new_speed
+                    now = time.monotonic()
+                    start_time = now - (now - start_time) * ratio
+                    targets = [target * ratio for target in targets]
+                    self._targets = targets
+                    self.speed = new_speed
+                
                 # 计算等待时间
-                event_time = event["time"]
-                wait_time = (event_time - last_event_time) / self.speed
+                event = events[i]
+                wait_time = start_time + targets[i] - time.monotonic()
                 
-                if wait_time > 0:
-                    time.sleep(wait_time)
+                if wait_time > 0 and self._wake_event.wait(wait_time):
+                    if self._stop_event.is_set():
+                        break
+                    # 暂停或速度被调整，回到循环开头处理后重新计算等待时间
+                    continue
                 
-                # 执行事件
-                success = self._execute_event(event)
+                end = i
+                if event["type"] == "mouse_move":
+                    # 按住按钮时逐点回放，保留拖拽轨迹
+                    late = wait_time < -self.max_move_lateness and not self._held_buttons
+                    
+                    # 连续的鼠标移动事件合并为一次平滑移动，每段不超过batch_max_duration
+                    if (self.batch_mouse_moves and not self._held_buttons) or late:
+                        limit = event["time"] + self.batch_max_duration
+                        while (end + 1 < count and events[end + 1]["type"] == "mouse_move"
+                               and (late or events[end + 1]["time"] <= limit)):
+                            end += 1
+                    
+                    if late:
+                        # 已落后于时间表，直接移动到该段的终点
+                        success = self._execute_event(events[end])
+                    elif end > i:
+                        success = self._execute_mouse_move_path(event, events[end])
+                    else:
+                        success = self._execute_event(event)
+                else:
+                    success = self._execute_event(event)
                 
                 # 调用事件回调
                 if self.on_event:
-                    self.on_event(i, event, success)
+                    for j in range(i, end + 1):
+                        self.on_event(j, events[j], success)
                 
-                # 更新上一个事件时间
-                last_event_time = event_time
+                i = end + 1
+                
+                # 等待图像的步骤会阻塞到图像出现或超时，与暂停一样将超出下一个事件目标时间的时长
+                # 从时间表中扣除，保持后续事件之间的间隔；其他事件的小延迟不计入，仍按绝对时间表追赶
+                if i < count and event["type"] in self._BLOCKING_EVENTS:
+                    overrun = time.monotonic() - (start_time + targets[i])
+                    if overrun > 0:
+                        start_time += overrun
+                
+                # 进度回调按批调用，合并的鼠标移动段只调用一次
+                if self.on_progress:
+                    self.on_progress(i, count)
             
             logger.info("回放完成")
         except Exception as e:
@@ -242,10 +583,25 @@ class EventPlayer:
                 self.on_error(str(e))
         finally:
             self.playing = False
+            pyautogui.PAUSE, pyautogui.MINIMUM_DURATION, pyautogui.MINIMUM_SLEEP = saved_timing
             
             # 调用停止回调
             if self.on_stop:
                 self.on_stop()
+            
+            self._finished_event.set()
+    
+    def wait_for_playback(self, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞等待当前回放结束
+        
+        参数:
+            timeout: 超时时间（秒），None则一直等待
+        
+        返回:
+            bool: 回放是否已结束（超时返回False）
+        """
+        return self._finished_event.wait(timeout)
     
     def _execute_event(self, event: Dict[str, Any]) -> bool:
         """
@@ -260,21 +616,12 @@ class EventPlayer:
         try:
             event_type = event["type"]
             
-            if event_type == "mouse_move":
-                return self._execute_mouse_move(event)
-            elif event_type == "mouse_click":
-                return self._execute_mouse_click(event)
-            elif event_type == "mouse_scroll":
-                return self._execute_mouse_scroll(event)
-            elif event_type == "key_press":
-                return self._execute_key_press(event)
-            elif event_type == "key_release":
-                return self._execute_key_release(event)
-            elif event_type == "wait_for_image":
-                return self._execute_wait_for_image(event)
-            else:
+            handler = self._HANDLERS.get(event_type)
+            if handler is None:
                 logger.warning(f"未知的事件类型: {event_type}")
                 return False
+            
+            return handler(self, event)
         except Exception as e:
             logger.error(f"执行事件失败: {str(e)}")
             return False
@@ -282,11 +629,52 @@ class EventPlayer:
     def _execute_mouse_move(self, event: Dict[str, Any]) -> bool:
         """执行鼠标移动事件"""
         try:
-            x = event["x"]
-            y = event["y"]
+            pos = (event["x"], event["y"])
+            
+            # 鼠标已在目标位置，跳过
+            if pos == self._last_pos:
+                return True
             
             # 移动鼠标
-            pyautogui.moveTo(x, y)
+            pyautogui.moveTo(*pos)
+            self._last_pos = pos
+            return True
+        except Exception as e:
+            logger.error(f"执行鼠标移动事件失败: {str(e)}")
+            return False
+    
+    def _execute_mouse_move_path(self, first: Dict[str, Any], last: Dict[str, Any]) -> bool:
+        """
+        执行一段连续的鼠标移动事件
+        
+        先移动到第一个点，再用一次带时长的moveTo平滑移动到最后一个点，
+        代替逐点调用moveTo
+        
+        参数:
+            first: 该段的第一个移动事件
+            last: 该段的最后一个移动事件
+        
+        返回:
+            bool: 是否成功执行
+        """
+        try:
+            duration = (last["time"] - first["time"]) / self.speed
+            start_time = time.time()
+            
+            first_pos = (first["x"], first["y"])
+            last_pos = (last["x"], last["y"])
+            
+            if first_pos != self._last_pos:
+                pyautogui.moveTo(*first_pos, _pause=False)
+            if last_pos != first_pos:
+                pyautogui.moveTo(*last_pos, duration=duration, _pause=False)
+            self._last_pos = last_pos
+            
+            # pyautogui对过短的时长会直接跳到终点，补足剩余时间以保持时序
+            remaining = duration - (time.time() - start_time)
+            if remaining > 0:
+                self._stop_event.wait(remaining)
+            
             return True
         except Exception as e:
             logger.error(f"执行鼠标移动事件失败: {str(e)}")
@@ -303,9 +691,12 @@ class EventPlayer:
             if pressed:
                 # 按下鼠标按钮
                 pyautogui.mouseDown(x=x, y=y, button=button)
+                self._held_buttons.add(button)
             else:
                 # 释放鼠标按钮
                 pyautogui.mouseUp(x=x, y=y, button=button)
+                self._held_buttons.discard(button)
+            self._last_pos = (x, y)
             
             return True
         except Exception as e:
@@ -358,34 +749,34 @@ class EventPlayer:
             image_path = event["image_path"]
             timeout = event.get("timeout", 10.0)
             confidence = event.get("confidence", config.match_threshold)
+            region = event.get("region")  # (x, y, width, height)，None则捕获整个屏幕
             
-            # 确保图像路径存在
-            if not os.path.isabs(image_path):
-                image_path = os.path.join(config.templates_path, image_path)
-            
-            if not os.path.exists(image_path):
-                logger.error(f"图像文件不存在: {image_path}")
+            template = self._get_template(image_path)
+            if template is None:
                 return False
             
-            # 等待图像出现
+            # 等待图像出现，轮询间隔从50毫秒指数增加到500毫秒
+            delay = 0.05
             start_time = time.time()
             while time.time() - start_time < timeout:
                 # 检查是否停止
                 if self._stop_event.is_set():
                     return False
                 
-                # 捕获屏幕
-                screenshot = self.screen_capture.capture()
+                # 捕获屏幕（只捕获指定区域），直接获取numpy数组，省去PIL转换
+                screenshot = self.screen_capture.capture_array(region)
                 
                 # 查找图像
-                result = self.image_recognition.find_template(screenshot, image_path, confidence)
+                result = self.image_recognition.find_template(screenshot, template, confidence)
                 
                 if result:
                     logger.debug(f"找到图像: {image_path}")
                     return True
                 
-                # 等待一段时间
-                time.sleep(0.5)
+                # 等待一段时间，停止回放时立即返回
+                if self._stop_event.wait(delay):
+                    return False
+                delay = min(delay * 1.5, 0.5)
             
             logger.warning(f"等待图像超时: {image_path}")
             return False
@@ -393,7 +784,82 @@ class EventPlayer:
             logger.error(f"执行等待图像事件失败: {str(e)}")
             return False
     
-    def add_wait_for_image(self, image_path: str, timeout: float = 10.0, confidence: float = None) -> bool:
+    def _execute_wait_for_any_image(self, event: Dict[str, Any]) -> bool:
+        """执行等待任意图像事件，每次轮询只捕获一次屏幕，所有模板共享截图的预处理"""
+        try:
+            image_paths = event["image_paths"]
+            timeout = event.get("timeout", 10.0)
+            confidence = event.get("confidence", config.match_threshold)
+            region = event.get("region")  # (x, y, width, height)，None则捕获整个屏幕
+            
+            if not image_paths:
+                logger.error("没有指定要等待的图像")
+                return False
+            
+            templates = []
+            for image_path in image_paths:
+                template = self._get_template(image_path)
+                if template is None:
+                    return False
+                templates.append(template)
+            
+            delay = 0.05
+            start_time = time.time()
+            while time.time() - start_time < timeout:
+                # 检查是否停止
+                if self._stop_event.is_set():
+                    return False
+                
+                # 所有模板共用同一张截图，灰度转换、金字塔和积分图只计算一次
+                screenshot = self.screen_capture.capture_array(region)
+                matches = self.image_recognition.find_any_template(screenshot, templates, confidence)
+                
+                # 任意一个模板匹配成功即返回
+                for image_path, match in zip(image_paths, matches):
+                    if match:
+                        logger.debug(f"找到图像: {image_path}")
+                        return True
+                
+                # 等待一段时间，停止回放时立即返回
+                if self._stop_event.wait(delay):
+                    return False
+                delay = min(delay * 1.5, 0.5)
+            
+            logger.warning(f"等待图像超时: {', '.join(image_paths)}")
+            return False
+        except Exception as e:
+            logger.error(f"执行等待任意图像事件失败: {str(e)}")
+            return False
+    
+    def _get_template(self, image_path: str) -> Optional[np.ndarray]:
+        """
+        获取模板图像
+        
+        参数:
+            image_path: 图像路径，相对路径相对于模板目录
+        
+        返回:
+            模板图像数组，文件不存在或无法加载则返回None
+        """
+        # 确保图像路径存在
+        if not os.path.isabs(image_path):
+            image_path = os.path.join(config.templates_path, image_path)
+        
+        if not os.path.exists(image_path):
+            logger.error(f"图像文件不存在: {image_path}")
+            return None
+        
+        # 模板按(路径, 修改时间)缓存，轮询和重复回放时都不再重新解码文件
+        template = self._load_template(image_path, os.path.getmtime(image_path))
+        if template is None:
+            logger.error(f"无法加载图像文件: {image_path}")
+        return template
+    
+    def add_wait_for_image(self,
+                           image_path: str,
+                           timeout: float = 10.0,
+                           confidence: float = None,
+                           region: Optional[Tuple[int, int, int, int]] = None) -> bool:
         """
         添加等待图像事件
         
@@ -401,6 +867,7 @@ class EventPlayer:
             image_path: 图像路径
             timeout: 超时时间（秒）
             confidence: 匹配阈值（0-1），None则使用默认值
+            region: 搜索区域 (x, y, width, height)，None则搜索整个屏幕
         
         返回:
             bool: 是否成功添加
@@ -415,6 +882,9 @@ class EventPlayer:
                 "confidence": confidence or config.match_threshold
             }
             
+            if region:
+                event["region"] = list(region)
+            
             # 添加到事件列表
             self.events.append(event)
             
@@ -422,6 +892,73 @@ class EventPlayer:
         except Exception as e:
             logger.error(f"添加等待图像事件失败: {str(e)}")
             return False
+    
+    def add_wait_for_any_image(self,
+                               image_paths: List[str],
+                               timeout: float = 10.0,
+                               confidence: float = None,
+                               region: Optional[Tuple[int, int, int, int]] = None) -> bool:
+        """
+        添加等待任意图像事件，任意一个图像出现即继续回放
+        
+        参数:
+            image_paths: 图像路径列表
+            timeout: 超时时间（秒）
+            confidence: 匹配阈值（0-1），None则使用默认值
+            region: 搜索区域 (x, y, width, height)，None则搜索整个屏幕
+        
+        返回:
+            bool: 是否成功添加
+        """
+        try:
+            # 创建等待任意图像事件，时间与录制中的事件一样相对于录制开始，接在最后一个事件之后
+            event = {
+                "type": "wait_for_any_image",
+                "time": self.events[-1]["time"] if self.events else 0.0,
+                "image_paths": list(image_paths),
+                "timeout": timeout,
+                "confidence": confidence or config.match_threshold
+            }
+            
+            if region:
+                event["region"] = list(region)
+            
+            # 添加到事件列表
+            self.events.append(event)
+            
+            return True
+        except Exception as e:
+            logger.error(f"添加等待任意图像事件失败: {str(e)}")
+            return False
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _load_template(image_path: str, mtime: float) -> Optional[np.ndarray]:
+        """
+        加载并缓存模板图像
+        
+        参数:
+            image_path: 图像路径
+            mtime: 图像文件的修改时间，文件更新后缓存自动失效
+        
+        返回:
+            解码后的BGR图像数组，加载失败则返回None
+        """
+        return cv2.imread(image_path, cv2.IMREAD_COLOR)
+    
+    # 执行时间不固定、会阻塞回放的事件类型
+    _BLOCKING_EVENTS: ClassVar[frozenset] = frozenset(("wait_for_image", "wait_for_any_image"))
+    
+    # 事件类型到执行方法的分发表
+    _HANDLERS: ClassVar[Dict[str, Callable[['EventPlayer', Dict[str, Any]], bool]]] = {
+        "mouse_move": _execute_mouse_move,
+        "mouse_click": _execute_mouse_click,
+        "mouse_scroll": _execute_mouse_scroll,
+        "key_press": _execute_key_press,
+        "key_release": _execute_key_release,
+        "wait_for_image": _execute_wait_for_image,
+        "wait_for_any_image": _execute_wait_for_any_image,
+    }
 
 """
 使用示例：
@@ -6,9 +6,12 @@
 import os
 import time
 import json
+import heapq
 import logging
-from typing import Dict, List, Optional, Tuple, Any
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Any, Union
 from threading import Thread, Event, Lock
+import numpy as np
 from pynput import mouse, keyboard
 from datetime import datetime
 
@@ -16,6 +19,107 @@ from config import config
 
 logger = logging.getLogger('EventRecorder')
 
+# 尝试导入orjson库，用于更高效的JSON序列化
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 预先计算的鼠标按钮和特殊按键名称，避免监听器线程上每个事件都做字符串转换
+_BUTTON_NAMES: Dict[mouse.Button, str] = {button: button.name for button in mouse.Button}
+_KEY_NAMES: Dict[keyboard.Key, str] = {key: key.name for key in keyboard.Key}
+
+
+def _key_name(key: Union[keyboard.Key, keyboard.KeyCode]) -> Optional[str]:
+    """
+    获取按键名称
+    
+    参数:
+        key: pynput按键
+    
+    返回:
+        特殊按键返回其名称，普通按键返回对应字符
+    """
+    name = _KEY_NAMES.get(key)
+    if name is not None:
+        return name
+    if hasattr(key, 'char'):
+        return key.char
+    return str(key).split('.')[-1]
+
+
+class MouseMoveBuffer:
+    """
+    鼠标移动事件的列式缓冲区
+    
+    鼠标移动是录制中频率最高的事件，按列存储时间和坐标，
+    避免为每个事件分配字典，容量不足时倍增扩容
+    """
+    
+    __slots__ = ("_times", "_coords", "_size")
+    
+    def __init__(self, capacity: int = 1024):
+        """
+        初始化缓冲区
+        
+        参数:
+            capacity: 初始容量
+        """
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._coords = np.empty((capacity, 2), dtype=np.int32)
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def append(self, t: float, x: int, y: int) -> None:
+        """
+        追加一个鼠标移动事件
+        
+        参数:
+            t: 相对录制开始的时间（秒）
+            x: X坐标
+            y: Y坐标
+        """
+        size = self._size
+        if size == len(self._times):
+            self._grow()
+        
+        self._times[size] = t
+        self._coords[size] = (x, y)
+        self._size = size + 1
+    
+    def clear(self) -> None:
+        """清空缓冲区（保留已分配的容量）"""
+        self._size = 0
+    
+    def to_events(self) -> List[Dict[str, Any]]:
+        """
+        转换为事件字典列表
+        
+        返回:
+            List[Dict[str, Any]]: 鼠标移动事件列表
+        """
+        size = self._size
+        times = self._times[:size].tolist()
+        coords = self._coords[:size].tolist()
+        return [
+            {"type": "mouse_move", "time": t, "x": x, "y": y}
+            for t, (x, y) in zip(times, coords)
+        ]
+    
+    def _grow(self) -> None:
+        """容量倍增"""
+        capacity = max(1, len(self._times)) * 2
+        times = np.empty(capacity, dtype=np.float64)
+        coords = np.empty((capacity, 2), dtype=np.int32)
+        times[:self._size] = self._times[:self._size]
+        coords[:self._size] = self._coords[:self._size]
+        self._times = times
+        self._coords = coords
+
+
 class EventRecorder:
     """事件记录器类，记录用户的鼠标和键盘操作"""
     
@@ -25,11 +129,20 @@ class EventRecorder:
         self.recording = False
         self.paused = False
         self._stop_event = Event()
+        self._stopped_event = Event()  # 没有正在进行的录制时处于置位状态，停止时在所有清理完成后置位
+        self._stopped_event.set()
         
-        # 事件列表和锁
-        self.events: List[Dict[str, Any]] = []
+        # 事件列表和锁（鼠标移动事件单独按列存储）
+        self._events: List[Dict[str, Any]] = []
+        self._mouse_moves = MouseMoveBuffer()
         self.events_lock = Lock()
         
+        # 监听器线程只把原始事件放入队列（deque.append是原子操作，无需加锁），
+        # 由消费线程定期取出写入事件列表和自动保存文件
+        self._queue = deque()
+        self.drain_interval = config.get("recording.drain_interval", 0.01)
+        self.drain_thread = None
+        
         # 监听器
         self.mouse_listener = None
         self.keyboard_listener = None
@@ -38,10 +151,13 @@ class EventRecorder:
         self.auto_save = config.get("recording.auto_save", True)
         self.save_interval = config.get("recording.save_interval", 30)
         self.auto_save_thread = None
+        self.auto_save_path: Optional[str] = None
+        self._auto_save_file = None  # 追加写入的JSONL文件，每行一个事件
         
         # 配置
         self.include_mouse = config.get("recording.include_mouse", True)
         self.include_keyboard = config.get("recording.include_keyboard", True)
+        self.file_format = config.get("recording.file_format", "jsonl")  # jsonl（每行一个事件）或json
         self.hotkey = config.get("recording.hotkey", "esc")
         
         # 记录开始时间
@@ -53,6 +169,31 @@ class EventRecorder:
         self.on_pause = None
         self.on_resume = None
     
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """
+        按时间顺序排列的全部事件
+        
+        鼠标移动事件在访问时才转换为字典并与其他事件合并
+        """
+        with self.events_lock:
+            self._drain_queue()
+            others = list(self._events)
+            moves = self._mouse_moves.to_events()
+        
+        if not moves:
+            return others
+        if not others:
+            return moves
+        return list(heapq.merge(others, moves, key=lambda event: event["time"]))
+    
+    @property
+    def events_count(self) -> int:
+        """已记录的事件数量"""
+        with self.events_lock:
+            self._drain_queue()
+            return len(self._events) + len(self._mouse_moves)
+    
     def start_recording(self) -> bool:
         """
         开始记录
@@ -67,12 +208,15 @@ class EventRecorder:
         try:
             # 清空事件列表
             with self.events_lock:
-                self.events = []
+                self._events = []
+                self._mouse_moves.clear()
+                self._queue.clear()
             
             # 重置状态
             self.recording = True
             self.paused = False
             self._stop_event.clear()
+            self._stopped_event.clear()
             
             # 记录开始时间
             self.start_time = time.time()
@@ -93,6 +237,15 @@ class EventRecorder:
                 )
                 self.keyboard_listener.start()
             
+            # 打开自动保存文件
+            if self.auto_save:
+                self._open_auto_save_file()
+            
+            # 启动事件队列消费线程
+            self.drain_thread = Thread(target=self._drain_loop)
+            self.drain_thread.daemon = True
+            self.drain_thread.start()
+            
             # 启动自动保存线程
             if self.auto_save:
                 self.auto_save_thread = Thread(target=self._auto_save_loop)
@@ -135,11 +288,22 @@ class EventRecorder:
                 self.keyboard_listener.stop()
                 self.keyboard_listener = None
             
+            # 等待事件队列消费线程结束，并取出队列中剩余的事件
+            if self.drain_thread and self.drain_thread.is_alive():
+                self.drain_thread.join()
+                self.drain_thread = None
+            
+            with self.events_lock:
+                self._drain_queue()
+            
             # 等待自动保存线程结束
             if self.auto_save_thread and self.auto_save_thread.is_alive():
                 self.auto_save_thread.join()
                 self.auto_save_thread = None
             
+            # 关闭自动保存文件
+            self._close_auto_save_file()
+            
             logger.info("停止记录用户操作")
             
             # 调用回调函数
@@ -150,6 +314,20 @@ class EventRecorder:
         except Exception as e:
             logger.error(f"停止记录器失败: {str(e)}")
             return False
+        finally:
+            self._stopped_event.set()
+    
+    def wait_for_stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞等待当前录制停止
+        
+        参数:
+            timeout: 超时时间（秒），None则一直等待
+        
+        返回:
+            bool: 录制是否已停止（超时返回False）
+        """
+        return self._stopped_event.wait(timeout)
     
     def pause_recording(self) -> bool:
         """
@@ -189,6 +367,28 @@ class EventRecorder:
         
         return True
     
+    def get_recordings_list(self) -> List[str]:
+        """
+        获取录制目录中的录制文件列表
+        
+        使用os.scandir遍历目录，文件的修改时间随目录项一起返回，无需逐个调用os.stat
+        
+        返回:
+            List[str]: 录制文件名列表，按修改时间从新到旧排列
+        """
+        try:
+            with os.scandir(config.recordings_path) as it:
+                entries = [
+                    entry for entry in it
+                    if entry.is_file() and entry.name.endswith((".json", ".jsonl"))
+                ]
+            
+            entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            return [entry.name for entry in entries]
+        except Exception as e:
+            logger.error(f"获取录制列表失败: {str(e)}")
+            return []
+    
     def save_recording(self, file_path: Optional[str] = None) -> bool:
         """
         保存记录
@@ -203,11 +403,14 @@ class EventRecorder:
             # 如果没有指定路径，使用默认路径
             if not file_path:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                file_path = os.path.join(config.recordings_path, f"recording_{timestamp}.json")
+                file_path = os.path.join(config.recordings_path, f"recording_{timestamp}.{self.file_format}")
             
             # 确保目录存在
             os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
             
+            if file_path.endswith('.jsonl'):
+                return self._save_jsonl(file_path)
+            
             # 准备保存数据
             recording_data = {
                 "version": "1.0",
@@ -219,8 +422,12 @@ class EventRecorder:
             }
             
             # 保存到文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(recording_data, f, indent=2)
+            if ORJSON_AVAILABLE:
+                with open(file_path, 'wb') as f:
+                    f.write(orjson.dumps(recording_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(recording_data, f, indent=2)
             
             logger.info(f"已保存记录到: {file_path}")
             return True
@@ -228,20 +435,122 @@ class EventRecorder:
             logger.error(f"保存记录失败: {str(e)}")
             return False
     
-    def _auto_save_loop(self) -> None:
-        """自动保存循环"""
-        last_save_time = time.time()
+    def _save_jsonl(self, file_path: str) -> bool:
+        """
+        以JSONL格式保存记录（每行一个事件）
+        
+        录制已结束且自动保存文件完整写入时，自动保存文件本身就是最终结果，直接移动过去；
+        否则从内存中的事件逐行写出
+        
+        参数:
+            file_path: 保存路径
         
-        while not self._stop_event.is_set():
-            current_time = time.time()
+        返回:
+            bool: 是否成功保存
+        """
+        auto_save_path = self.auto_save_path
+        if (not self.recording and self._auto_save_file is None
+                and auto_save_path and os.path.exists(auto_save_path)):
+            os.replace(auto_save_path, file_path)
+            self.auto_save_path = None
+        else:
+            with open(file_path, 'wb') as f:
+                if ORJSON_AVAILABLE:
+                    for event in self.events:
+                        f.write(orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE))
+                else:
+                    for event in self.events:
+                        f.write((json.dumps(event) + '\n').encode('utf-8'))
+        
+        logger.info(f"已保存记录到: {file_path}")
+        return True
+    
+    def _open_auto_save_file(self) -> None:
+        """打开本次录制的自动保存文件（JSONL格式，每行一个事件）"""
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.auto_save_path = os.path.join(config.recordings_path, f"recording_{timestamp}.jsonl")
+        
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.auto_save_path)), exist_ok=True)
             
-            # 检查是否需要自动保存
-            if current_time - last_save_time >= self.save_interval:
-                if self.save_recording():
-                    last_save_time = current_time
+            with self.events_lock:
+                self._auto_save_file = open(self.auto_save_path, 'ab', buffering=1 << 16)
             
-            # 等待一段时间
-            self._stop_event.wait(1.0)
+            logger.debug(f"自动保存到: {self.auto_save_path}")
+        except Exception as e:
+            logger.error(f"打开自动保存文件失败: {str(e)}")
+            self.auto_save_path = None
+    
+    def _close_auto_save_file(self) -> None:
+        """刷新并关闭自动保存文件"""
+        with self.events_lock:
+            if self._auto_save_file:
+                self._auto_save_file.close()
+                self._auto_save_file = None
+    
+    def _write_auto_save_line(self, line: bytes) -> None:
+        """
+        向自动保存文件追加一行，调用方需持有events_lock
+        
+        参数:
+            line: 以换行结尾的JSON字节串
+        """
+        try:
+            self._auto_save_file.write(line)
+        except Exception as e:
+            logger.error(f"写入自动保存文件失败: {str(e)}")
+            self._auto_save_file = None
+            self.auto_save_path = None  # 文件已不完整，保存时不能直接使用
+    
+    def _auto_save_loop(self) -> None:
+        """自动保存循环，只需定期把已追加的事件刷新到磁盘"""
+        while not self._stop_event.wait(self.save_interval):
+            with self.events_lock:
+                if not self._auto_save_file:
+                    continue
+                
+                try:
+                    self._auto_save_file.flush()
+                    os.fsync(self._auto_save_file.fileno())
+                except Exception as e:
+                    logger.error(f"自动保存失败: {str(e)}")
+    
+    def _drain_loop(self) -> None:
+        """事件队列消费循环，定期把监听器放入队列的事件写入事件列表"""
+        while not self._stop_event.wait(self.drain_interval):
+            if not self._queue:
+                continue
+            
+            with self.events_lock:
+                self._drain_queue()
+    
+    def _drain_queue(self) -> None:
+        """
+        取出队列中的全部事件，写入事件列表和自动保存文件，调用方需持有events_lock
+        """
+        queue = self._queue
+        write_line = self._write_auto_save_line
+        while queue:
+            event_type, t, payload = queue.popleft()
+            
+            if event_type == "mouse_move":
+                x, y = payload
+                self._mouse_moves.append(t, x, y)
+                
+                if self._auto_save_file:
+                    line = '{"type":"mouse_move","time":%r,"x":%d,"y":%d}\n' % (t, x, y)
+                    write_line(line.encode('ascii'))
+                continue
+            
+            event = {"type": event_type, "time": t, **payload}
+            self._events.append(event)
+            
+            if self._auto_save_file:
+                if ORJSON_AVAILABLE:
+                    line = orjson.dumps(event) + b'\n'
+                else:
+                    line = (json.dumps(event) + '\n').encode('utf-8')
+                write_line(line)
     
     def _add_event(self, event_type: str, **kwargs) -> None:
         """
@@ -254,25 +563,20 @@ class EventRecorder:
         if not self.recording or self.paused:
             return
         
-        # 创建事件数据
-        event = {
-            "type": event_type,
-            "time": time.time() - self.start_time,
-            **kwargs
-        }
-        
-        # 添加到事件列表
-        with self.events_lock:
-            self.events.append(event)
+        # 放入队列，由消费线程写入事件列表
+        self._queue.append((event_type, time.time() - self.start_time, kwargs))
     
     def _on_mouse_move(self, x: int, y: int) -> None:
         """鼠标移动事件处理"""
-        self._add_event("mouse_move", x=x, y=y)
+        if not self.recording or self.paused:
+            return
+        
+        self._queue.append(("mouse_move", time.time() - self.start_time, (x, y)))
     
     def _on_mouse_click(self, x: int, y: int, button: mouse.Button, pressed: bool) -> None:
         """鼠标点击事件处理"""
         # 转换按钮为字符串
-        button_str = str(button).split('.')[-1]
+        button_str = _BUTTON_NAMES.get(button) or str(button).split('.')[-1]
         
         self._add_event(
             "mouse_click",
@@ -295,10 +599,7 @@ class EventRecorder:
     def _on_key_press(self, key: Union[keyboard.Key, keyboard.KeyCode]) -> None:
         """键盘按下事件处理"""
         # 检查是否是停止热键
-        if hasattr(key, 'char'):
-            key_str = key.char
-        else:
-            key_str = str(key).split('.')[-1]
+        key_str = _key_name(key)
         
         if key_str == self.hotkey:
             self.stop_recording()
@@ -311,10 +612,7 @@ class EventRecorder:
     
     def _on_key_release(self, key: Union[keyboard.Key, keyboard.KeyCode]) -> None:
         """键盘释放事件处理"""
-        if hasattr(key, 'char'):
-            key_str = key.char
-        else:
-            key_str = str(key).split('.')[-1]
+        key_str = _key_name(key)
         
         self._add_event(
             "key_release",
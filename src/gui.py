@@ -6,7 +6,8 @@
 import os
 import sys
 import time
-import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import logging
@@ -15,7 +16,8 @@ import numpy as np
 from PIL import Image, ImageTk
 
 # 导入其他模块
-from screen_capture import ScreenCapture
+from config import config
+from screen_capture import ScreenCapture, DXCAM_AVAILABLE
 from image_recognition import ImageRecognition
 from event_recorder import EventRecorder
 from event_player import EventPlayer
@@ -52,15 +54,40 @@ class AutomationGUI:
         self.is_capturing = False
         self.capture_interval = 500  # 屏幕捕获间隔（毫秒）
         
+        # 屏幕捕获：在Tk线程中通过after()定时截图并刷新预览
+        self._capture_job = None
+        self._frame_buf = None  # 复用的截图缓冲区
+        self._preview_delays = deque(maxlen=10)  # 最近几次刷新预览的耗时（毫秒）
+        
+        # 预览缩放：缩放结果写入复用的缓冲区
+        self._resize_buf = None
+        
+        # 模板匹配结果叠加在预览上显示一段时间，直接画进每一帧的图像数据中
+        self.match_overlay_duration = 3.0  # 秒
+        self._match_boxes = None  # 截图坐标系中的匹配区域数组 (N, 4)
+        self._match_screen_width = 0
+        self._match_boxes_until = 0.0
+        
+        # 模板查找和文字识别等耗时操作在后台线程中执行，结果通过after()回到Tk线程
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+        self._closing = False  # 窗口关闭后后台任务的结果不再交回Tk线程
+        
+        # 滑块和微调框连续变化时合并更新，只应用最后一个值
+        self._pending_speed_job = None
+        self._pending_interval_job = None
+        
+        # 录制目录上次刷新列表时的修改时间，目录未变化时跳过刷新
+        self._recordings_list_mtime = None
+        self._playback_list_mtime = None
+        
+        # 模板列表中当前显示的模板名称，刷新时只插入和删除有变化的条目
+        self._displayed_templates = set()
+        
         # 创建UI
         self._create_ui()
         
         # 绑定关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self._on_close)
-        
-        # 启动屏幕捕获线程
-        self.capture_thread = None
-        self.stop_capture = threading.Event()
     
     def _create_ui(self):
         """创建用户界面"""
@@ -333,6 +360,17 @@ class AutomationGUI:
         )
         full_screen_check.pack(anchor=tk.W, padx=5, pady=5)
         
+        # DXGI桌面复制（仅Windows，需要安装dxcam）
+        self.use_dxgi_var = tk.BooleanVar(value=self.screen_capture.use_dxgi)
+        dxgi_check = ttk.Checkbutton(
+            region_frame,
+            text="使用DXGI桌面复制",
+            variable=self.use_dxgi_var,
+            command=self._toggle_dxgi,
+            state=tk.NORMAL if DXCAM_AVAILABLE else tk.DISABLED
+        )
+        dxgi_check.pack(anchor=tk.W, padx=5, pady=5)
+        
         # 区域输入框
         region_inputs_frame = ttk.Frame(parent)
         region_inputs_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -361,6 +399,8 @@ class AutomationGUI:
         region_height_entry = ttk.Entry(region_inputs_frame, textvariable=self.region_height_var, width=10)
         region_height_entry.grid(row=1, column=3, padx=5, pady=2)
         
+        self._region_entries = (region_x_entry, region_y_entry, region_width_entry, region_height_entry)
+        
         # 初始禁用区域输入
         self._toggle_region_inputs()
         
@@ -378,79 +418,150 @@ class AutomationGUI:
         preview_label = ttk.Label(parent, text="屏幕预览:")
         preview_label.pack(anchor=tk.W, padx=5, pady=5)
         
+        # 状态栏，显示识别结果等提示，不弹出模态对话框以免中断预览刷新
+        self.status_var = tk.StringVar()
+        status_label = ttk.Label(parent, textvariable=self.status_var)
+        status_label.pack(side=tk.BOTTOM, anchor=tk.W, padx=5, pady=5)
+        
         # 预览画布
         self.preview_canvas = tk.Canvas(parent, bg="black")
         self.preview_canvas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # 预览图像只在尺寸变化时重新创建，每帧把新数据粘贴到同一个PhotoImage中
+        self._preview_photo = None
+        self._preview_item = None
+        self._preview_frame = None  # 当前显示的缩放后BGR帧
+        self.preview_canvas.bind("<Configure>", self._on_preview_configure)
+        
         # 开始屏幕捕获
         self._start_screen_capture()
     
     def _start_screen_capture(self):
-        """启动屏幕捕获线程"""
-        if self.capture_thread is None or not self.capture_thread.is_alive():
-            self.stop_capture.clear()
-            self.capture_thread = threading.Thread(target=self._capture_loop)
-            self.capture_thread.daemon = True
-            self.capture_thread.start()
+        """启动预览刷新"""
+        if self._capture_job is None:
+            self._capture_job = self.root.after(self.capture_interval, self._do_preview_frame)
     
     def _stop_screen_capture(self):
-        """停止屏幕捕获线程"""
-        self.stop_capture.set()
-        if self.capture_thread and self.capture_thread.is_alive():
-            self.capture_thread.join()
-    
-    def _capture_loop(self):
-        """屏幕捕获循环"""
-        while not self.stop_capture.is_set():
-            try:
-                # 获取捕获区域
-                if self.full_screen_var.get():
-                    screen = self.screen_capture.capture_screen()
-                else:
-                    region = {
-                        "left": self.region_x_var.get(),
-                        "top": self.region_y_var.get(),
-                        "width": self.region_width_var.get(),
-                        "height": self.region_height_var.get()
-                    }
-                    screen = self.screen_capture.capture_screen(region)
+        """停止预览刷新"""
+        if self._capture_job is not None:
+            self.root.after_cancel(self._capture_job)
+            self._capture_job = None
+    
+    def _get_capture_region(self):
+        """根据设置获取捕获区域 (x, y, width, height)，全屏则返回None"""
+        if self.full_screen_var.get():
+            return None
+        return (
+            self.region_x_var.get(),
+            self.region_y_var.get(),
+            self.region_width_var.get(),
+            self.region_height_var.get()
+        )
+    
+    def _is_preview_visible(self):
+        """预览画布当前是否可见"""
+        if self.root.state() in ("withdrawn", "iconic"):
+            return False
+        if not self.preview_canvas.winfo_viewable():
+            return False
+        return self.preview_canvas.winfo_width() >= 16 and self.preview_canvas.winfo_height() >= 16
+    
+    def _do_preview_frame(self):
+        """截图并刷新一帧预览，然后根据实际耗时安排下一次刷新"""
+        start_time = time.perf_counter()
+        
+        try:
+            # 窗口最小化或预览不可见时不截图
+            if self._is_preview_visible():
+                # 截图直接写入复用的缓冲区，避免每帧分配新数组
+                screen = self.screen_capture.capture_array(self._get_capture_region(), out=self._frame_buf)
+                self._frame_buf = screen
                 
                 # 调整图像大小以适应预览窗口
                 preview_width = self.preview_canvas.winfo_width()
                 preview_height = self.preview_canvas.winfo_height()
                 
-                if preview_width > 1 and preview_height > 1:  # 确保窗口已经创建
-                    # 计算缩放比例
-                    scale = min(
-                        preview_width / screen.shape[1],
-                        preview_height / screen.shape[0]
-                    )
-                    
-                    # 缩放图像
-                    width = int(screen.shape[1] * scale)
-                    height = int(screen.shape[0] * scale)
-                    resized = cv2.resize(screen, (width, height))
-                    
-                    # 转换为PhotoImage
-                    image = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-                    image = Image.fromarray(image)
-                    photo = ImageTk.PhotoImage(image=image)
-                    
-                    # 更新预览
-                    self.preview_canvas.delete("all")
-                    self.preview_canvas.create_image(
-                        preview_width // 2,
-                        preview_height // 2,
-                        image=photo,
-                        anchor=tk.CENTER
-                    )
-                    self.preview_canvas.image = photo  # 保持引用
-            
-            except Exception as e:
-                logger.error(f"屏幕捕获错误: {str(e)}")
+                # 计算缩放比例
+                scale = min(
+                    preview_width / screen.shape[1],
+                    preview_height / screen.shape[0]
+                )
+                
+                # 缩放图像
+                width = int(screen.shape[1] * scale)
+                height = int(screen.shape[0] * scale)
+                resized = self._resize_preview(screen, width, height)
+                
+                # 叠加匹配标记
+                self._stamp_matches(resized)
+                
+                # PIL解码BGR数据时直接交换通道，省去一次cvtColor
+                self._preview_frame = resized
+                image = Image.frombuffer("RGB", (width, height), resized, "raw", "BGR", 0, 1)
+                
+                # 更新预览
+                self._show_preview_frame(image)
+        
+        except Exception as e:
+            logger.error(f"屏幕捕获错误: {str(e)}")
+        
+        # 扣除刷新本身的平均耗时，使预览帧率接近设置的捕获间隔
+        self._preview_delays.append((time.perf_counter() - start_time) * 1000.0)
+        average_delay = sum(self._preview_delays) / len(self._preview_delays)
+        delay = max(1, int(self.capture_interval - average_delay))
+        
+        self._capture_job = self.root.after(delay, self._do_preview_frame)
+    
+    def _resize_preview(self, screen, width, height):
+        """
+        将截图缩小到预览尺寸
+        
+        使用INTER_AREA插值，预览尺寸不变时复用上一次的目标缓冲区
+        
+        参数:
+            screen: BGR格式的截图
+            width: 目标宽度
+            height: 目标高度
+        
+        返回:
+            缩放后的BGR图像
+        """
+        if self._resize_buf is None or self._resize_buf.shape != (height, width, 3):
+            self._resize_buf = np.empty((height, width, 3), dtype=np.uint8)
+        
+        return cv2.resize(screen, (width, height), dst=self._resize_buf, interpolation=cv2.INTER_AREA)
+    
+    def _show_preview_frame(self, image):
+        """
+        显示一帧预览图像
+        
+        参数:
+            image: 缩放后的PIL图像
+        """
+        width, height = image.size
+        
+        # 尺寸变化时才重新创建PhotoImage
+        if (self._preview_photo is None or
+                self._preview_photo.width() != width or
+                self._preview_photo.height() != height):
+            self._preview_photo = ImageTk.PhotoImage(mode="RGB", size=(width, height))
             
-            # 等待下一次捕获
-            time.sleep(self.capture_interval / 1000.0)
+            if self._preview_item is None:
+                self._preview_item = self.preview_canvas.create_image(
+                    self.preview_canvas.winfo_width() // 2,
+                    self.preview_canvas.winfo_height() // 2,
+                    image=self._preview_photo,
+                    anchor=tk.CENTER
+                )
+            else:
+                self.preview_canvas.itemconfig(self._preview_item, image=self._preview_photo)
+        
+        self._preview_photo.paste(image)
+    
+    def _on_preview_configure(self, event):
+        """预览画布大小变化时，使预览图像保持居中"""
+        if self._preview_item is not None:
+            self.preview_canvas.coords(self._preview_item, event.width // 2, event.height // 2)
     
     def _toggle_recording(self):
         """切换录制状态"""
@@ -474,7 +585,7 @@ class AutomationGUI:
     
     def _save_recording(self):
         """保存当前录制"""
-        if self.event_recorder.events:
+        if self.event_recorder.events_count:
             if self.event_recorder.save_recording():
                 self._refresh_recordings_list()
                 messagebox.showinfo("成功", "录制已保存")
@@ -521,29 +632,69 @@ class AutomationGUI:
         """更新速度标签"""
         speed = self.speed_var.get()
         self.speed_label.config(text=f"{speed:.1f}x")
+        
+        # 拖动滑块时每个像素都会触发，延迟应用到播放器
+        if self._pending_speed_job is not None:
+            self.root.after_cancel(self._pending_speed_job)
+        self._pending_speed_job = self.root.after(50, self._apply_speed)
+    
+    def _apply_speed(self):
+        """将当前速度应用到播放器"""
+        self._pending_speed_job = None
         if self.is_playing:
-            self.event_player.set_speed(speed)
+            self.event_player.set_speed(self.speed_var.get())
     
     def _refresh_recordings_list(self):
         """刷新录制列表"""
+        mtime = self._get_recordings_dir_mtime()
+        if mtime is not None and mtime == self._recordings_list_mtime:
+            return
+        self._recordings_list_mtime = mtime
+        
         self.recordings_listbox.delete(0, tk.END)
         recordings = self.event_recorder.get_recordings_list()
-        for recording in recordings:
-            self.recordings_listbox.insert(tk.END, recording)
+        if recordings:
+            # 一次调用插入全部条目，减少Tcl调用次数
+            self.recordings_listbox.insert(tk.END, *recordings)
     
     def _refresh_playback_list(self):
         """刷新回放列表"""
+        mtime = self._get_recordings_dir_mtime()
+        if mtime is not None and mtime == self._playback_list_mtime:
+            return
+        self._playback_list_mtime = mtime
+        
         self.playback_listbox.delete(0, tk.END)
         recordings = self.event_player.get_recordings_list()
-        for recording in recordings:
-            self.playback_listbox.insert(tk.END, recording)
+        if recordings:
+            self.playback_listbox.insert(tk.END, *recordings)
+    
+    def _get_recordings_dir_mtime(self):
+        """获取录制目录的修改时间（纳秒），目录不存在则返回None"""
+        try:
+            return os.stat(config.recordings_path).st_mtime_ns
+        except OSError:
+            return None
     
     def _refresh_templates_list(self):
         """刷新模板列表"""
-        self.templates_listbox.delete(0, tk.END)
-        templates = [name for name in self.image_recognition.templates.keys()]
-        for template in templates:
-            self.templates_listbox.insert(tk.END, template)
+        templates = set(self.image_recognition.templates)
+        displayed = self._displayed_templates
+        
+        # 删除已不存在的模板，从后往前删除以保持索引有效
+        removed = displayed - templates
+        if removed:
+            items = self.templates_listbox.get(0, tk.END)
+            for index in reversed(range(len(items))):
+                if items[index] in removed:
+                    self.templates_listbox.delete(index)
+        
+        # 插入新增的模板
+        added = templates - displayed
+        if added:
+            self.templates_listbox.insert(tk.END, *sorted(added))
+        
+        self._displayed_templates = templates
     
     def _on_recording_selected(self, event):
         """处理录制选择事件"""
@@ -587,47 +738,117 @@ class AutomationGUI:
             return
         
         template_name = self.templates_listbox.get(selection[0])
-        screen = self.screen_capture.capture_screen()
         
-        locations = self.image_recognition.find_template(screen, template_name)
+        # 在后台线程中匹配，避免阻塞界面
+        screen = self.screen_capture.capture_array()
+        future = self._io_pool.submit(self.image_recognition.find_template, screen, template_name)
+        future.add_done_callback(
+            lambda f: self._call_in_tk(self._on_find_template_done, f, screen.shape)
+        )
+    
+    def _call_in_tk(self, callback, *args):
+        """
+        从后台线程将回调交给Tk线程执行，窗口关闭后丢弃
+        
+        参数:
+            callback: 回调函数
+            *args: 回调参数
+        """
+        if self._closing:
+            return
+        try:
+            self.root.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            # 检查标志之后窗口恰好被销毁
+            pass
+    
+    def _on_find_template_done(self, future, screen_shape):
+        """
+        显示模板查找结果
+        
+        参数:
+            future: 模板查找任务
+            screen_shape: 截图的形状
+        """
+        try:
+            locations = future.result()
+        except Exception as e:
+            logger.error(f"查找模板失败: {str(e)}")
+            self.status_var.set("查找模板失败")
+            return
         
         if locations:
-            # 在预览中标记匹配位置
-            preview_width = self.preview_canvas.winfo_width()
-            preview_height = self.preview_canvas.winfo_height()
+            # find_template返回单个 (x, y, width, height)，也兼容多个匹配的列表
+            boxes = np.atleast_2d(np.asarray(locations, dtype=np.float64))[:, :4]
             
-            scale = min(
-                preview_width / screen.shape[1],
-                preview_height / screen.shape[0]
-            )
+            # 在预览中标记匹配位置，之后的帧继续叠加显示
+            self._match_boxes = boxes
+            self._match_screen_width = screen_shape[1]
+            self._match_boxes_until = time.monotonic() + self.match_overlay_duration
+            self._draw_matches()
             
-            for x, y, w, h, conf in locations:
-                # 缩放坐标
-                scaled_x = int(x * scale)
-                scaled_y = int(y * scale)
-                scaled_w = int(w * scale)
-                scaled_h = int(h * scale)
-                
-                # 绘制矩形
-                self.preview_canvas.create_rectangle(
-                    scaled_x,
-                    scaled_y,
-                    scaled_x + scaled_w,
-                    scaled_y + scaled_h,
-                    outline="red",
-                    width=2
-                )
-            
-            messagebox.showinfo("成功", f"找到 {len(locations)} 个匹配")
+            self.status_var.set(f"找到 {len(boxes)} 个匹配")
         else:
-            messagebox.showinfo("提示", "未找到匹配")
+            self.status_var.set("未找到匹配")
+    
+    def _stamp_matches(self, frame):
+        """
+        将匹配区域画进预览帧的BGR数据中，超过显示时长后清除
+        
+        参数:
+            frame: 缩放后的预览帧
+        """
+        if self._match_boxes is None:
+            return
+        
+        if time.monotonic() > self._match_boxes_until:
+            self._match_boxes = None
+            return
+        
+        # 按预览缩放比例一次性换算所有矩形的坐标
+        scale = frame.shape[1] / self._match_screen_width
+        boxes = (self._match_boxes * scale).astype(np.int32)
+        
+        for x, y, w, h in boxes.tolist():
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+    
+    def _draw_matches(self):
+        """在当前显示的预览帧上立即画出匹配区域，只粘贴一次"""
+        frame = self._preview_frame
+        if frame is None or self._preview_photo is None:
+            return
+        
+        self._stamp_matches(frame)
+        
+        height, width = frame.shape[:2]
+        image = Image.frombuffer("RGB", (width, height), frame, "raw", "BGR", 0, 1)
+        self._preview_photo.paste(image)
     
     def _recognize_text(self):
         """识别屏幕文字"""
-        screen = self.screen_capture.capture_screen()
-        text = self.image_recognition.recognize_text(screen)
+        # OCR耗时较长，在后台线程中执行
+        screen = self.screen_capture.capture_array()
+        future = self._io_pool.submit(self.image_recognition.get_text, screen)
+        future.add_done_callback(lambda f: self._call_in_tk(self._show_ocr_text, f))
+        self.status_var.set("正在识别文字...")
+    
+    def _show_ocr_text(self, future):
+        """
+        显示文字识别结果
+        
+        参数:
+            future: 文字识别任务
+        """
+        try:
+            text = future.result()
+        except Exception as e:
+            logger.error(f"识别文字失败: {str(e)}")
+            self.status_var.set("识别文字失败")
+            return
         
         if text:
+            self.status_var.set("")
+            
             # 创建文本显示窗口
             text_window = tk.Toplevel(self.root)
             text_window.title("识别结果")
@@ -639,17 +860,27 @@ class AutomationGUI:
             text_widget.insert(tk.END, text)
             text_widget.config(state=tk.DISABLED)
         else:
-            messagebox.showinfo("提示", "未识别到文字")
+            self.status_var.set("未识别到文字")
     
     def _toggle_region_inputs(self):
         """切换区域输入状态"""
-        state = tk.DISABLED if self.full_screen_var.get() else tk.NORMAL
-        for child in self.winfo_children():
-            if isinstance(child, ttk.Entry):
-                child.config(state=state)
+        state = ["disabled"] if self.full_screen_var.get() else ["!disabled"]
+        for entry in self._region_entries:
+            entry.state(state)
+    
+    def _toggle_dxgi(self):
+        """切换是否使用DXGI桌面复制捕获屏幕"""
+        self.screen_capture.use_dxgi = DXCAM_AVAILABLE and self.use_dxgi_var.get()
     
     def _update_capture_interval(self):
         """更新捕获间隔"""
+        if self._pending_interval_job is not None:
+            self.root.after_cancel(self._pending_interval_job)
+        self._pending_interval_job = self.root.after(50, self._apply_capture_interval)
+    
+    def _apply_capture_interval(self):
+        """应用当前捕获间隔"""
+        self._pending_interval_job = None
         self.capture_interval = self.interval_var.get()
     
     def _save_settings(self):
@@ -659,6 +890,9 @@ class AutomationGUI:
     
     def _on_close(self):
         """关闭窗口时的处理"""
+        # 之后完成的后台任务不再调用root.after()
+        self._closing = True
+        
         # 停止录制
         if self.is_recording:
             self.event_recorder.stop_recording()
@@ -670,6 +904,9 @@ class AutomationGUI:
         # 停止屏幕捕获
         self._stop_screen_capture()
         
+        # 不再等待尚未完成的后台任务
+        self._io_pool.shutdown(wait=False)
+        
         # 销毁窗口
         self.root.destroy()
 
@@ -169,10 +169,14 @@ class BaseDialog(QDialog):
     
     def clear_content(self):
         """清空内容区域"""
-        while self.content_layout.count():
-            item = self.content_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        # 从末尾开始取出，避免每次takeAt(0)都移动布局内部的列表
+        for i in reversed(range(self.content_layout.count())):
+            item = self.content_layout.takeAt(i)
+            widget = item.widget()
+            if widget:
+                # 先脱离父部件，避免删除过程中触发额外的重新布局
+                widget.setParent(None)
+                widget.deleteLater()
 
 """
 使用示例：
@@ -8,19 +8,29 @@ import sys
 import json
 import time
 import logging
+import threading
 from typing import Dict, List, Optional, Any
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QTextEdit, QListWidget, QListWidgetItem,
+    QPushButton, QLabel, QPlainTextEdit, QListView,
     QTabWidget, QFileDialog, QMessageBox, QComboBox, QSpinBox,
     QDoubleSpinBox, QCheckBox, QGroupBox, QFormLayout, QLineEdit,
     QSplitter, QMenu, QAction, QToolBar, QStatusBar, QDialog
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize
+from PyQt5.QtCore import (
+    Qt, QThread, pyqtSignal, QTimer, QSize, QAbstractListModel, QModelIndex,
+    QObject, QRunnable, QThreadPool, QFileSystemWatcher, QMetaObject, Q_ARG, pyqtSlot
+)
 from PyQt5.QtGui import QIcon, QFont, QPixmap
 
-# 导入项目模块
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 尝试导入orjson库，用于更高效的JSON解析和序列化
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# 导入项目模块（src目录由main.py或安装后的顶层模块提供，直接运行本模块请使用 python -m gui.main_window）
 from config import config
 from automation_script import AutomationScript
 from event_recorder import EventRecorder
@@ -32,41 +42,274 @@ from logger import logger_setup
 # 设置日志
 logger = logger_setup.get_logger('GUI')
 
-class RecordingThread(QThread):
-    """录制线程"""
+class ProgressThrottler:
+    """
+    进度信号节流器
+    
+    工作线程每个事件/步骤都会上报进度，直接逐条emit会让GUI线程的事件队列被跨线程信号淹没。
+    节流器只记录最新进度，每个间隔最多发送一次；间隔内到达的最后一次进度由单次定时器在间隔结束时补发，
+    长时间的步骤或等待期间界面也会显示最新进度。到达末尾或flush时立即发送。
+    """
+    
+    def __init__(self, signal, interval: float):
+        """
+        初始化节流器
+        
+        参数:
+            signal: 要发送的进度信号（参数为 当前索引, 总数）
+            interval: 最小发送间隔（秒）
+        """
+        self.signal = signal
+        self.interval = interval
+        self._last_emit = 0.0
+        self._current = 0
+        self._total = 0
+        self._pending = False
+        
+        # 进度由回放或脚本线程上报，这些线程没有Qt事件循环，补发使用threading.Timer；
+        # 信号在锁内发送，保证补发的旧进度不会晚于新进度到达
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+    
+    def update(self, current: int, total: int):
+        """
+        记录最新进度，必要时发送信号
+        
+        参数:
+            current: 当前索引
+            total: 总数
+        """
+        with self._lock:
+            self._current = current
+            self._total = total
+            now = time.monotonic()
+            if current >= total or now - self._last_emit >= self.interval:
+                self._last_emit = now
+                self._pending = False
+                self.signal.emit(current, total)
+            else:
+                self._pending = True
+                if self._timer is None:
+                    self._timer = threading.Timer(self.interval - (now - self._last_emit), self._emit_pending)
+                    self._timer.daemon = True
+                    self._timer.start()
+    
+    def _emit_pending(self):
+        """定时器到期时补发间隔内最后一次进度"""
+        with self._lock:
+            self._timer = None
+            if self._pending:
+                self._pending = False
+                self._last_emit = time.monotonic()
+                self.signal.emit(self._current, self._total)
+    
+    def flush(self):
+        """发送尚未发出的最新进度"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._pending:
+                self._pending = False
+                self._last_emit = time.monotonic()
+                self.signal.emit(self._current, self._total)
+
+class ScriptStepsModel(QAbstractListModel):
+    """
+    脚本步骤列表模型
+    
+    直接引用脚本数据中的步骤列表，显示文本（含序号）在绘制时按行生成，
+    增删步骤只通知受影响的行，不需要重建整个列表。
+    """
+    
+    def __init__(self, parent=None):
+        """
+        初始化模型
+        
+        参数:
+            parent: 父对象
+        """
+        super().__init__(parent)
+        self._steps: List[Dict[str, Any]] = []
+    
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """返回步骤数量"""
+        if parent.isValid():
+            return 0
+        return len(self._steps)
+    
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        """
+        返回指定行的数据
+        
+        参数:
+            index: 行索引
+            role: 数据角色
+        
+        返回:
+            Any: 显示文本或步骤数据
+        """
+        if not index.isValid() or index.row() >= len(self._steps):
+            return None
+        
+        step = self._steps[index.row()]
+        
+        if role == Qt.DisplayRole:
+            return f"{index.row() + 1}. {step.get('description', step['type'])}"
+        elif role == Qt.UserRole:
+            return step
+        
+        return None
+    
+    def reset(self, steps: Optional[List[Dict[str, Any]]]):
+        """
+        替换全部步骤
+        
+        参数:
+            steps: 新的步骤列表（直接引用，不复制）
+        """
+        self.beginResetModel()
+        self._steps = steps if steps is not None else []
+        self.endResetModel()
+    
+    def insert_step(self, row: int, step: Dict[str, Any]):
+        """
+        在指定位置插入步骤
+        
+        参数:
+            row: 插入位置
+            step: 步骤数据
+        """
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._steps.insert(row, step)
+        self.endInsertRows()
+        self._renumber_from(row + 1)
+    
+    def remove_step(self, row: int):
+        """
+        删除指定位置的步骤
+        
+        参数:
+            row: 步骤位置
+        """
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._steps.pop(row)
+        self.endRemoveRows()
+        self._renumber_from(row)
+    
+    def update_step(self, row: int):
+        """
+        通知指定步骤已被修改
+        
+        参数:
+            row: 步骤位置
+        """
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+    
+    def _renumber_from(self, row: int):
+        """
+        通知从指定行开始的序号已变化
+        
+        参数:
+            row: 起始行
+        """
+        if row < len(self._steps):
+            self.dataChanged.emit(self.index(row), self.index(len(self._steps) - 1), [Qt.DisplayRole])
+
+class ScreenshotJobSignals(QObject):
+    """截图任务信号（QRunnable不是QObject，信号需要单独的载体）"""
+    
+    done = pyqtSignal(str, bool, str)  # 文件路径, 是否成功, 错误信息
+
+class ScreenshotJob(QRunnable):
+    """截图任务，在线程池中完成截图和PNG编码保存，避免阻塞GUI线程"""
+    
+    def __init__(self, capture: ScreenCapture, file_path: str, compress_level: int):
+        """
+        初始化截图任务
+        
+        参数:
+            capture: 屏幕捕获器
+            file_path: 保存路径
+            compress_level: PNG压缩级别（0-9）
+        """
+        super().__init__()
+        self.capture = capture
+        self.file_path = file_path
+        self.compress_level = compress_level
+        self.signals = ScreenshotJobSignals()
+    
+    def run(self):
+        """运行任务"""
+        try:
+            screenshot = self.capture.capture()
+            screenshot.save(self.file_path, compress_level=self.compress_level)
+            self.signals.done.emit(self.file_path, True, "")
+        except Exception as e:
+            logger.error(f"保存截图失败: {str(e)}")
+            self.signals.done.emit(self.file_path, False, str(e))
+
+class BackgroundWorker(QObject):
+    """
+    后台任务基类
+    
+    工作对象通过moveToThread放入常驻的QThread中，任务由GUI线程以排队调用的方式投递到run槽，
+    同一个线程和信号连接在多次运行之间复用
+    """
     
     # 信号
     status_signal = pyqtSignal(str)
     finished_signal = pyqtSignal(bool)
     
-    def __init__(self, recorder: EventRecorder, output_file: str):
+    # 等待任务结束时检查线程中断请求的间隔（秒）
+    INTERRUPT_CHECK_INTERVAL = 0.1
+    
+    def __init__(self):
+        """初始化后台任务"""
+        super().__init__()
+        self.busy = False  # 由GUI线程在投递任务时置位，任务结束时清除
+    
+    def interruption_requested(self) -> bool:
+        """所在线程是否已被请求中断（关闭窗口时由GUI线程调用requestInterruption）"""
+        return QThread.currentThread().isInterruptionRequested()
+
+class RecordingWorker(BackgroundWorker):
+    """录制任务"""
+    
+    def __init__(self, recorder: EventRecorder):
         """
-        初始化录制线程
+        初始化录制任务
         
         参数:
             recorder: 事件录制器
-            output_file: 输出文件路径
         """
         super().__init__()
         self.recorder = recorder
-        self.output_file = output_file
     
-    def run(self):
-        """运行线程"""
+    @pyqtSlot(str)
+    def run(self, output_file: str):
+        """
+        录制直到停止，然后保存
+        
+        参数:
+            output_file: 输出文件路径
+        """
         try:
             # 开始录制
             self.recorder.start_recording()
             self.status_signal.emit("正在录制...")
             
-            # 等待录制结束
-            while self.recorder.recording:
-                time.sleep(0.1)
+            # 等待录制结束，线程被请求中断时主动停止录制
+            while not self.recorder.wait_for_stop(self.INTERRUPT_CHECK_INTERVAL):
+                if self.interruption_requested():
+                    self.recorder.stop_recording()
             
             # 保存录制
-            success = self.recorder.save_recording(self.output_file)
+            success = self.recorder.save_recording(output_file)
             
             if success:
-                self.status_signal.emit(f"已保存录制到: {self.output_file}")
+                self.status_signal.emit(f"已保存录制到: {output_file}")
             else:
                 self.status_signal.emit("保存录制失败")
             
@@ -75,53 +318,55 @@ class RecordingThread(QThread):
             logger.error(f"录制线程出错: {str(e)}")
             self.status_signal.emit(f"录制出错: {str(e)}")
             self.finished_signal.emit(False)
+        finally:
+            self.busy = False
 
-class PlaybackThread(QThread):
-    """回放线程"""
+class PlaybackWorker(BackgroundWorker):
+    """回放任务"""
     
     # 信号
-    status_signal = pyqtSignal(str)
     progress_signal = pyqtSignal(int, int)  # 当前事件索引, 总事件数
-    finished_signal = pyqtSignal(bool)
     
-    def __init__(self, player: EventPlayer, recording_file: str, speed: float = 1.0):
+    def __init__(self, player: EventPlayer):
         """
-        初始化回放线程
+        初始化回放任务
         
         参数:
             player: 事件播放器
-            recording_file: 录制文件路径
-            speed: 回放速度
         """
         super().__init__()
         self.player = player
-        self.recording_file = recording_file
-        self.speed = speed
+        self._progress = ProgressThrottler(self.progress_signal, config.get("gui.progress_interval", 1 / 30))
     
-    def run(self):
-        """运行线程"""
+    @pyqtSlot(str, float)
+    def run(self, recording_file: str, speed: float):
+        """
+        加载并回放录制文件
+        
+        参数:
+            recording_file: 录制文件路径
+            speed: 回放速度
+        """
         try:
             # 加载录制文件
-            if not self.player.load_recording(self.recording_file):
-                self.status_signal.emit(f"加载录制文件失败: {self.recording_file}")
+            if not self.player.load_recording(recording_file):
+                self.status_signal.emit(f"加载录制文件失败: {recording_file}")
                 self.finished_signal.emit(False)
                 return
             
-            # 设置事件回调
-            total_events = len(self.player.events)
-            
-            def on_event(index, event, success):
-                self.progress_signal.emit(index + 1, total_events)
-            
-            self.player.on_event = on_event
+            # 设置进度回调（按批上报，不需要逐个事件的回调）
+            self.player.on_event = None
+            self.player.on_progress = self._progress.update
             
             # 开始回放
-            self.player.start_playback(speed=self.speed)
+            self.player.start_playback(speed=speed)
             self.status_signal.emit("正在回放...")
             
-            # 等待回放结束
-            while self.player.playing:
-                time.sleep(0.1)
+            # 等待回放结束，线程被请求中断时主动停止回放
+            while not self.player.wait_for_playback(self.INTERRUPT_CHECK_INTERVAL):
+                if self.interruption_requested():
+                    self.player.stop_playback()
+            self._progress.flush()
             
             self.status_signal.emit("回放已完成")
             self.finished_signal.emit(True)
@@ -129,47 +374,58 @@ class PlaybackThread(QThread):
             logger.error(f"回放线程出错: {str(e)}")
             self.status_signal.emit(f"回放出错: {str(e)}")
             self.finished_signal.emit(False)
+        finally:
+            self.busy = False
 
-class ScriptThread(QThread):
-    """脚本执行线程"""
+class ScriptWorker(BackgroundWorker):
+    """脚本执行任务"""
     
     # 信号
-    status_signal = pyqtSignal(str)
     progress_signal = pyqtSignal(int, int)  # 当前步骤索引, 总步骤数
-    finished_signal = pyqtSignal(bool)
     
-    def __init__(self, script: AutomationScript, script_data: Dict[str, Any]):
+    def __init__(self, script: AutomationScript):
         """
-        初始化脚本执行线程
+        初始化脚本执行任务
         
         参数:
             script: 自动化脚本执行器
-            script_data: 脚本数据
         """
         super().__init__()
         self.script = script
-        self.script_data = script_data
+        self._progress = ProgressThrottler(self.progress_signal, config.get("gui.progress_interval", 1 / 30))
     
-    def run(self):
-        """运行线程"""
+    @pyqtSlot(object)
+    def run(self, script_data: Dict[str, Any]):
+        """
+        执行脚本
+        
+        参数:
+            script_data: 脚本数据
+        """
         try:
             # 设置脚本数据
-            self.script.script_data = self.script_data
+            self.script.script_data = script_data
             
             # 设置回调函数
-            total_steps = len(self.script_data.get("steps", []))
+            steps = script_data.get("steps", [])
+            total_steps = len(steps)
+            
+            # 预先计算每个步骤的描述，回调中只需按索引取值
+            descriptions = [step.get("description", step["type"]) for step in steps]
             
             def on_step_start(step_index, step):
-                description = step.get("description", step["type"])
-                self.status_signal.emit(f"执行步骤 {step_index + 1}: {description}")
-                self.progress_signal.emit(step_index + 1, total_steps)
+                # 线程被请求中断时，当前步骤结束后停止脚本
+                if self.interruption_requested():
+                    self.script.stop_script()
+                self.status_signal.emit(f"执行步骤 {step_index + 1}: {descriptions[step_index]}")
+                self._progress.update(step_index + 1, total_steps)
             
             def on_step_end(step_index, step, success):
                 status = "成功" if success else "失败"
-                description = step.get("description", step["type"])
-                self.status_signal.emit(f"步骤 {step_index + 1} ({description}) 执行{status}")
+                self.status_signal.emit(f"步骤 {step_index + 1} ({descriptions[step_index]}) 执行{status}")
             
             def on_script_end(success):
+                self._progress.flush()
                 status = "成功" if success else "失败"
                 self.status_signal.emit(f"脚本执行{status}")
                 self.finished_signal.emit(success)
@@ -184,6 +440,8 @@ class ScriptThread(QThread):
             logger.error(f"脚本执行线程出错: {str(e)}")
             self.status_signal.emit(f"脚本执行出错: {str(e)}")
             self.finished_signal.emit(False)
+        finally:
+            self.busy = False
 
 class MainWindow(QMainWindow):
     """主窗口类"""
@@ -218,10 +476,27 @@ class MainWindow(QMainWindow):
         self.player.on_start = lambda: self.status_bar.showMessage("开始回放")
         self.player.on_stop = lambda: self.status_bar.showMessage("停止回放")
         
-        # 线程
-        self.recording_thread = None
-        self.playback_thread = None
-        self.script_thread = None
+        # 后台任务，各自运行在常驻线程中
+        self.recording_worker = RecordingWorker(self.recorder)
+        self.recording_worker.status_signal.connect(self.status_bar.showMessage)
+        self.recording_worker.finished_signal.connect(self._on_recording_finished)
+        
+        self.playback_worker = PlaybackWorker(self.player)
+        self.playback_worker.status_signal.connect(self.status_bar.showMessage)
+        self.playback_worker.progress_signal.connect(self._on_playback_progress, Qt.QueuedConnection)
+        self.playback_worker.finished_signal.connect(self._on_playback_finished)
+        
+        self.script_worker = ScriptWorker(self.script)
+        self.script_worker.status_signal.connect(self._append_log)
+        self.script_worker.progress_signal.connect(self._on_script_progress, Qt.QueuedConnection)
+        self.script_worker.finished_signal.connect(self._on_script_finished)
+        
+        self._worker_threads: List[QThread] = []
+        for worker in (self.recording_worker, self.playback_worker, self.script_worker):
+            thread = QThread(self)
+            worker.moveToThread(thread)
+            thread.start()
+            self._worker_threads.append(thread)
         
         # 当前脚本数据
         self.current_script_data = None
@@ -230,11 +505,47 @@ class MainWindow(QMainWindow):
         # 当前录制文件
         self.current_recording_file = None
         
-        # 更新状态
+        # 关闭确认状态：确认框以非阻塞方式打开，用户确认后再次调用close()
+        self._close_confirmed = False
+        self._close_dialog = None
+        
+        # 文件对话框的起始目录，只在配置文件变化时重新读取
+        self._dialog_dirs: Dict[str, str] = {}
+        self._load_dialog_dirs()
+        
+        self._config_watcher = QFileSystemWatcher(self)
+        self._config_watcher.fileChanged.connect(self._on_config_file_changed)
+        if os.path.exists(config.config_file):
+            self._config_watcher.addPath(config.config_file)
+        
+        # 更新状态（短时间内的多次请求合并为一次刷新）
+        self._status_pending = False
         self._update_status()
         
         logger.info("GUI已初始化")
     
+    def _load_dialog_dirs(self):
+        """从配置中读取文件对话框的起始目录"""
+        self._dialog_dirs = {
+            "scripts": config.scripts_path,
+            "recordings": config.recordings_path,
+            "screenshots": config.screenshots_path
+        }
+    
+    def _on_config_file_changed(self, path: str):
+        """
+        配置文件变化回调，重新加载配置并刷新缓存的目录
+        
+        参数:
+            path: 配置文件路径
+        """
+        config.load_config()
+        self._load_dialog_dirs()
+        
+        # 编辑器保存时可能先删除再重建文件，监视会被移除，需要重新添加
+        if os.path.exists(path) and path not in self._config_watcher.files():
+            self._config_watcher.addPath(path)
+    
     def _create_actions(self):
         """创建动作"""
         # 文件菜单动作
@@ -377,7 +688,10 @@ class MainWindow(QMainWindow):
         script_group = QGroupBox("脚本步骤")
         script_layout = QVBoxLayout(script_group)
         
-        self.script_list = QListWidget()
+        self.script_model = ScriptStepsModel(self)
+        self.script_list = QListView()
+        self.script_list.setModel(self.script_model)
+        self.script_list.setUniformItemSizes(True)
         script_layout.addWidget(self.script_list)
         
         # 创建步骤操作按钮
@@ -423,10 +737,17 @@ class MainWindow(QMainWindow):
         log_label = QLabel("日志输出:")
         control_layout.addWidget(log_label)
         
-        self.log_output = QTextEdit()
+        # QPlainTextEdit追加是增量的，并限制最大行数，长时间运行时内存不会无限增长
+        self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        self.log_output.setMaximumBlockCount(config.get("gui.log_max_lines", 5000))
         control_layout.addWidget(self.log_output)
         
+        # 日志缓冲，按固定间隔批量写入输出框
+        self._log_buf: List[str] = []
+        self._log_flush_pending = False
+        self._log_flush_interval = config.get("gui.log_flush_interval", 100)  # 毫秒
+        
         right_layout.addWidget(control_group)
         
         # 添加面板到分割器
@@ -437,7 +758,15 @@ class MainWindow(QMainWindow):
         splitter.setSizes([300, 700])
     
     def _update_status(self):
+        """请求更新状态，10毫秒内的多次请求只刷新一次"""
+        if not self._status_pending:
+            self._status_pending = True
+            QTimer.singleShot(10, self._apply_status)
+    
+    def _apply_status(self):
         """更新状态"""
+        self._status_pending = False
+        
         # 更新动作状态
         is_recording = self.recorder.recording if hasattr(self, 'recorder') else False
         is_playing = self.player.playing if hasattr(self, 'player') else False
@@ -471,14 +800,20 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "打开脚本",
-            config.get("paths.scripts", "scripts"),
+            self._dialog_dirs["scripts"],
             "JSON文件 (*.json)"
         )
         
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.current_script_data = json.load(f)
+                # 一次读入整个文件再解析，json.load会分多次小块读取
+                with open(file_path, 'rb') as f:
+                    content = f.read()
+                
+                if ORJSON_AVAILABLE:
+                    self.current_script_data = orjson.loads(content)
+                else:
+                    self.current_script_data = json.loads(content)
                 self.current_script_file = file_path
                 
                 self._update_script_list()
@@ -495,8 +830,14 @@ class MainWindow(QMainWindow):
             return self._save_script_as()
         
         try:
-            with open(self.current_script_file, 'w', encoding='utf-8') as f:
-                json.dump(self.current_script_data, f, indent=2)
+            # 先序列化为完整的字节串再一次写入，json.dump会逐个片段写入文件
+            if ORJSON_AVAILABLE:
+                content = orjson.dumps(self.current_script_data, option=orjson.OPT_INDENT_2)
+            else:
+                content = json.dumps(self.current_script_data, indent=2).encode('utf-8')
+            
+            with open(self.current_script_file, 'wb') as f:
+                f.write(content)
             
             self.status_bar.showMessage(f"已保存脚本: {self.current_script_file}")
             return True
@@ -512,7 +853,7 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "保存脚本",
-            config.get("paths.scripts", "scripts"),
+            self._dialog_dirs["scripts"],
             "JSON文件 (*.json)"
         )
         
@@ -543,16 +884,12 @@ class MainWindow(QMainWindow):
     
     def _update_script_list(self):
         """更新脚本列表"""
-        self.script_list.clear()
-        
+        # 模型直接引用脚本的步骤列表，显示文本按需生成，一次重置即可
         if not self.current_script_data:
+            self.script_model.reset(None)
             return
         
-        for i, step in enumerate(self.current_script_data.get("steps", [])):
-            description = step.get("description", step["type"])
-            item = QListWidgetItem(f"{i+1}. {description}")
-            item.setData(Qt.UserRole, step)
-            self.script_list.addItem(item)
+        self.script_model.reset(self.current_script_data.setdefault("steps", []))
     
     def _add_step(self):
         """添加步骤"""
@@ -566,8 +903,8 @@ class MainWindow(QMainWindow):
     
     def _remove_step(self):
         """删除步骤"""
-        current_item = self.script_list.currentItem()
-        if not current_item:
+        current_index = self.script_list.currentIndex()
+        if not current_index.isValid():
             return
         
         reply = QMessageBox.question(
@@ -578,9 +915,7 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
-            row = self.script_list.row(current_item)
-            self.script_list.takeItem(row)
-            self.current_script_data["steps"].pop(row)
+            self.script_model.remove_step(current_index.row())
     
     def _run_script(self):
         """运行脚本"""
@@ -588,30 +923,39 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "没有可运行的脚本")
             return
         
-        if self.script_thread and self.script_thread.isRunning():
+        if self.script_worker.busy:
             QMessageBox.warning(self, "警告", "脚本正在运行")
             return
         
-        # 创建并启动脚本线程
-        self.script_thread = ScriptThread(self.script, self.current_script_data)
-        
-        self.script_thread.status_signal.connect(
-            lambda msg: self.log_output.append(msg)
-        )
-        
-        self.script_thread.progress_signal.connect(
-            lambda current, total: self.status_bar.showMessage(f"执行步骤 {current}/{total}")
-        )
-        
-        self.script_thread.finished_signal.connect(
-            lambda success: self._on_script_finished(success)
+        # 投递到脚本线程执行
+        self.script_worker.busy = True
+        QMetaObject.invokeMethod(
+            self.script_worker, "run", Qt.QueuedConnection,
+            Q_ARG(object, self.current_script_data)
         )
+    
+    def _append_log(self, msg: str):
+        """
+        追加一行日志（先写入缓冲，由定时器批量刷新）
         
-        self.script_thread.start()
+        参数:
+            msg: 日志内容
+        """
+        self._log_buf.append(msg)
+        if not self._log_flush_pending:
+            self._log_flush_pending = True
+            QTimer.singleShot(self._log_flush_interval, self._flush_log)
+    
+    def _flush_log(self):
+        """把缓冲中的日志一次性写入输出框"""
+        self._log_flush_pending = False
+        if self._log_buf:
+            self.log_output.appendPlainText("\n".join(self._log_buf))
+            self._log_buf.clear()
     
     def _stop_script(self):
         """停止脚本"""
-        if self.script_thread and self.script_thread.isRunning():
+        if self.script_worker.busy:
             reply = QMessageBox.question(
                 self,
                 "停止脚本",
@@ -622,6 +966,11 @@ class MainWindow(QMainWindow):
             if reply == QMessageBox.Yes:
                 self.script.stop_script()
     
+    @pyqtSlot(int, int)
+    def _on_script_progress(self, current: int, total: int):
+        """脚本执行进度回调"""
+        self.status_bar.showMessage(f"执行步骤 {current}/{total}")
+    
     def _on_script_finished(self, success: bool):
         """脚本执行完成回调"""
         status = "成功" if success else "失败"
@@ -635,23 +984,17 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "保存录制",
-            config.recordings_path,
-            "JSON文件 (*.json)"
+            self._dialog_dirs["recordings"],
+            "JSONL文件 (*.jsonl);;JSON文件 (*.json)"
         )
         
         if file_path:
-            # 创建并启动录制线程
-            self.recording_thread = RecordingThread(self.recorder, file_path)
-            
-            self.recording_thread.status_signal.connect(
-                lambda msg: self.status_bar.showMessage(msg)
-            )
-            
-            self.recording_thread.finished_signal.connect(
-                lambda success: self._on_recording_finished(success)
+            # 投递到录制线程执行
+            self.recording_worker.busy = True
+            QMetaObject.invokeMethod(
+                self.recording_worker, "run", Qt.QueuedConnection,
+                Q_ARG(str, file_path)
             )
-            
-            self.recording_thread.start()
             self._update_status()
     
     def _stop_recording(self):
@@ -672,8 +1015,8 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "打开录制文件",
-            config.recordings_path,
-            "JSON文件 (*.json)"
+            self._dialog_dirs["recordings"],
+            "JSONL文件 (*.jsonl);;JSON文件 (*.json)"
         )
         
         if file_path:
@@ -687,26 +1030,13 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "警告", "没有可回放的录制文件")
             return
         
-        # 创建并启动回放线程
-        self.playback_thread = PlaybackThread(
-            self.player,
-            self.current_recording_file,
-            speed=1.0  # TODO: 添加速度控制
-        )
-        
-        self.playback_thread.status_signal.connect(
-            lambda msg: self.status_bar.showMessage(msg)
-        )
-        
-        self.playback_thread.progress_signal.connect(
-            lambda current, total: self.status_bar.showMessage(f"回放进度: {current}/{total}")
-        )
-        
-        self.playback_thread.finished_signal.connect(
-            lambda success: self._on_playback_finished(success)
+        # 投递到回放线程执行
+        self.playback_worker.busy = True
+        QMetaObject.invokeMethod(
+            self.playback_worker, "run", Qt.QueuedConnection,
+            Q_ARG(str, self.current_recording_file),
+            Q_ARG(float, 1.0)  # TODO: 添加速度控制
         )
-        
-        self.playback_thread.start()
         self._update_status()
     
     def _stop_playback(self):
@@ -715,6 +1045,11 @@ class MainWindow(QMainWindow):
             self.player.stop_playback()
             self._update_status()
     
+    @pyqtSlot(int, int)
+    def _on_playback_progress(self, current: int, total: int):
+        """回放进度回调"""
+        self.status_bar.showMessage(f"回放进度: {current}/{total}")
+    
     def _on_playback_finished(self, success: bool):
         """回放完成回调"""
         self._update_status()
@@ -727,17 +1062,23 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getSaveFileName(
             self,
             "保存截图",
-            config.screenshots_path,
+            self._dialog_dirs["screenshots"],
             "PNG图像 (*.png)"
         )
         
         if file_path:
-            screenshot = self.capture.capture()
-            try:
-                screenshot.save(file_path)
-                self.status_bar.showMessage(f"已保存截图: {file_path}")
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"保存截图失败: {str(e)}")
+            # 截图和PNG编码在线程池中进行，完成后通过信号回到GUI线程
+            job = ScreenshotJob(self.capture, file_path, config.get("capture.png_compress_level", 1))
+            job.signals.done.connect(self._on_screenshot_saved)
+            QThreadPool.globalInstance().start(job)
+            self.status_bar.showMessage("正在保存截图...")
+    
+    def _on_screenshot_saved(self, file_path: str, success: bool, error: str):
+        """截图保存完成回调"""
+        if success:
+            self.status_bar.showMessage(f"已保存截图: {file_path}")
+        else:
+            QMessageBox.critical(self, "错误", f"保存截图失败: {error}")
     
     def _find_image(self):
         """查找图像"""
@@ -767,10 +1108,48 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """窗口关闭事件"""
-        if self.current_script_data and self._check_save_changes():
+        if self.current_script_data and not self._close_confirmed:
+            # 不在closeEvent中运行嵌套的模态事件循环，改为打开确认框后忽略本次关闭
             event.ignore()
+            
+            if self._close_dialog is None:
+                self._close_dialog = QMessageBox(
+                    QMessageBox.Question,
+                    "保存更改",
+                    "是否保存对当前脚本的更改？",
+                    QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel,
+                    self
+                )
+                self._close_dialog.finished.connect(self._on_close_confirmed)
+                self._close_dialog.open()
+            return
+        
+        self._stop_background_tasks()
+        event.accept()
+    
+    def _on_close_confirmed(self, result: int):
+        """
+        关闭确认框结束回调
+        
+        参数:
+            result: 用户点击的按钮
+        """
+        self._close_dialog.deleteLater()
+        self._close_dialog = None
+        
+        if result == QMessageBox.Save:
+            if not self._save_script():
+                return
+        elif result != QMessageBox.Discard:
             return
         
+        self._close_confirmed = True
+        self.close()
+    
+    def _stop_background_tasks(self):
+        """停止录制、回放和脚本执行，每个线程最多等待一段时间"""
+        timeout = config.get("gui.thread_stop_timeout", 2000)  # 毫秒
+        
         # 停止录制和回放
         if self.recorder.recording:
             self.recorder.stop_recording()
@@ -779,11 +1158,18 @@ class MainWindow(QMainWindow):
             self.player.stop_playback()
         
         # 停止脚本执行
-        if self.script_thread and self.script_thread.isRunning():
+        if self.script_worker.busy:
             self.script.stop_script()
-            self.script_thread.wait()
         
-        event.accept()
+        # 请求中断（任务在等待中会自行停止），当前任务返回后退出线程的事件循环，超时则强制结束
+        for thread in self._worker_threads:
+            thread.requestInterruption()
+            thread.quit()
+        for thread in self._worker_threads:
+            if not thread.wait(timeout):
+                logger.warning("后台线程未能及时停止，强制结束")
+                thread.terminate()
+                thread.wait()
 
 def main():
     """主函数"""
@@ -4,22 +4,95 @@
 """
 
 import os
+import hashlib
+import itertools
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 import pytesseract
 from PIL import Image
 import logging
-from typing import Optional, Tuple, List, Union
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, List, Union
 
 from config import config
 
 logger = logging.getLogger('ImageRecognition')
 
+# 尝试导入tesserocr，直接调用Tesseract库，不必每次识别都启动tesseract进程
+try:
+    from tesserocr import PyTessBaseAPI, RIL, iterate_level
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+# 确保OpenCV使用按CPU指令集（SSE4/AVX2/AVX-512）分派的优化实现，金字塔缩小和灰度转换都依赖这些内核
+cv2.setUseOptimized(True)
+
+# 调试图像在后台线程中编码保存，积压过多时直接丢弃，不阻塞匹配
+_debug_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ImageRecognitionDebug')
+_debug_slots = threading.BoundedSemaphore(16)
+
+
+def _write_debug_image(filepath: str, image: np.ndarray, region: Tuple[int, int, int, int]) -> None:
+    """
+    绘制标记并保存调试图像（在后台线程中运行）
+    
+    参数:
+        filepath: 保存路径
+        image: 图像副本
+        region: 标记区域 (x, y, width, height)
+    """
+    try:
+        x, y, w, h = region
+        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.imwrite(filepath, image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        logger.debug("保存调试图像: %s", filepath)
+    except Exception as e:
+        logger.error(f"保存调试图像失败: {str(e)}")
+    finally:
+        _debug_slots.release()
+
 class ImageRecognition:
     """图像识别类，提供图像模板匹配和文字识别功能"""
     
     def __init__(self):
         """初始化图像识别"""
+        self._frame_cache: "OrderedDict[tuple, Tuple[bytes, Optional[Tuple[int, int, int, int]]]]" = OrderedDict()
+        self._frame_cache_lock = threading.Lock()
+        
+        # 大模板的频谱缓存：(模板, 修改时间, 频谱行数, 列数) -> (模板频谱, 去均值后模板的范数)
+        self._tpl_dft_cache: "OrderedDict[tuple, Tuple[np.ndarray, float]]" = OrderedDict()
+        
+        # tesserocr的API对象不能跨线程共享，每个线程各自创建并长期持有
+        self._tess_local = threading.local()
+        self.reload_config()
+        
+        self._ocr_cache: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._ocr_cache_lock = threading.Lock()
+        
+        # 已注册的模板及其预先计算的金字塔（第0层为原图），按名称查找
+        self.templates: Dict[str, np.ndarray] = {}
+        self._template_pyramids: Dict[str, List[np.ndarray]] = {}
+        self._gray_pyramids: Dict[str, List[np.ndarray]] = {}
+        if config.get('recognition.preload_templates', False):
+            self.load_templates()
+        
+        # 调试图像文件名：时间戳每秒最多格式化一次，同一秒内的多张图像用递增序号区分
+        self._debug_counter = itertools.count()
+        self._debug_stamp_time = 0
+        self._debug_stamp = ''
+    
+    def reload_config(self) -> None:
+        """
+        重新读取配置
+        
+        所有配置项只在这里读取并保存为属性，匹配和识别过程中不再查询配置；
+        运行时修改配置后调用此方法生效
+        """
         # 设置Tesseract OCR路径
         if hasattr(config, 'tesseract_path') and config.tesseract_path:
             pytesseract.pytesseract.tesseract_cmd = config.tesseract_path
@@ -27,7 +100,162 @@ class ImageRecognition:
         # 设置默认参数
         self.match_threshold = config.get('recognition.match_threshold', 0.8)
         self.ocr_lang = config.get('recognition.ocr_language', 'eng')
+        self.use_tesserocr = TESSEROCR_AVAILABLE and config.get('recognition.use_tesserocr', True)
+        self.tessdata_path = config.get('recognition.tessdata_path', None)  # None则使用tesserocr的默认路径
         self.debug_mode = config.get('recognition.debug_mode', False)
+        
+        # 金字塔预筛选：先在缩小的图像上匹配，得分足够高时再在原图的局部窗口内精确匹配
+        self.pyramid_levels = config.get('recognition.pyramid_levels', 3)  # 最多缩小次数，每次缩小一半，0表示禁用
+        self.pyramid_prefilter_ratio = config.get('recognition.pyramid_prefilter_ratio', 0.7)
+        self.pyramid_min_template_size = config.get('recognition.pyramid_min_template_size', 8)  # 缩小后模板的最小边长（像素）
+        self.pyramid_refine_margin = config.get('recognition.pyramid_refine_margin', 2)  # 逐层细化时窗口的外扩像素
+        self.pyramid_refine_candidates = config.get('recognition.pyramid_refine_candidates', 3)  # 缩小的图像上最多细化的候选位置数
+        
+        # 灰度匹配：只比较亮度，数据量为彩色匹配的三分之一，默认开启（兼容旧的recognition.grayscale配置项）
+        self.match_grayscale = config.get('recognition.match_grayscale', config.get('recognition.grayscale', True))
+        
+        # OCR结果缓存：按图像内容的哈希查找，区域内容未变化时不再重复运行Tesseract
+        self.ocr_cache_size = config.get('recognition.ocr_cache_size', 256)  # 0表示禁用
+        
+        # 模板匹配结果缓存：按截图的摘要判断画面是否变化，画面不变时直接返回上次的结果
+        self.frame_cache_size = config.get('recognition.frame_cache_size', 64)  # 0表示禁用
+        self.frame_digest_stride = config.get('recognition.frame_digest_stride', 1)  # 抽样间隔（像素），默认对全部像素求摘要，小目标的变化也不会漏掉
+        
+        # 频域匹配：不使用金字塔时，边长不小于此值的模板在频域中做灰度匹配，模板频谱按名称或路径缓存
+        self.fft_min_template_size = config.get('recognition.fft_min_template_size', 64)
+        self.fft_cache_size = config.get('recognition.fft_cache_size', 16)  # 0表示不缓存模板频谱
+        
+        # 平坦区域过滤：窗口内像素标准差低于此值的位置（纯色背景等）不可能与有纹理的模板匹配，得分直接置零
+        self.flat_stddev_threshold = config.get('recognition.flat_stddev_threshold', 2.0)  # 0表示禁用
+        
+        with self._frame_cache_lock:
+            self._frame_cache.clear()
+            self._tpl_dft_cache.clear()
+        
+        # 调试图像目录，首次保存时创建
+        self._debug_dir = os.path.join(config.get('paths.debug', 'debug'), 'image_recognition')
+        self._debug_dir_ready = False
+    
+    def add_template(self, name: str, template: Union[str, np.ndarray, Image.Image]) -> bool:
+        """
+        注册模板图像，并预先计算其金字塔
+        
+        参数:
+            name: 模板名称，之后可以用名称代替图像调用find_template
+            template: 模板图像（文件路径、numpy数组或PIL图像）
+        
+        返回:
+            bool: 是否成功注册
+        """
+        try:
+            tpl = self._load_image(template)
+            if tpl is None:
+                logger.error(f"无法加载模板图像: {name}")
+                return False
+            
+            # 保存为连续内存，匹配时不再复制
+            self.templates[name] = np.ascontiguousarray(tpl)
+            self.precompute_pyramid(name)
+            
+            # 同名模板被替换后，之前缓存的匹配结果不再有效
+            with self._frame_cache_lock:
+                for key in [key for key in self._frame_cache if key[0] == name]:
+                    del self._frame_cache[key]
+                for key in [key for key in self._tpl_dft_cache if key[0] == name]:
+                    del self._tpl_dft_cache[key]
+            return True
+        except Exception as e:
+            logger.error(f"注册模板失败: {str(e)}")
+            return False
+    
+    def load_templates(self, root: Optional[str] = None) -> int:
+        """
+        注册目录下（含子目录）的所有模板图像，启动时一次完成加载和预处理
+        
+        模板名称为相对于root的路径（使用/分隔），之后可以用名称调用find_template
+        
+        参数:
+            root: 模板目录，None则使用配置的模板路径
+        
+        返回:
+            int: 成功注册的模板数量
+        """
+        if root is None:
+            root = config.templates_path
+        if not os.path.isdir(root):
+            return 0
+        
+        count = 0
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if not filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
+                    continue
+                file_path = os.path.join(dirpath, filename)
+                name = os.path.relpath(file_path, root).replace(os.sep, '/')
+                if self.add_template(name, file_path):
+                    count += 1
+        
+        logger.info(f"已注册 {count} 个模板: {root}")
+        return count
+    
+    def precompute_pyramid(self, name: str) -> None:
+        """
+        预先计算已注册模板的彩色和灰度金字塔，匹配时不再重复转换和缩小模板
+        
+        参数:
+            name: 模板名称
+        """
+        tpl = self.templates[name]
+        self._template_pyramids[name] = self._build_pyramid(tpl)
+        self._gray_pyramids[name] = self._build_pyramid(self._to_gray(tpl))
+    
+    def _build_pyramid(self, image: np.ndarray) -> List[np.ndarray]:
+        """
+        构建图像金字塔
+        
+        参数:
+            image: 原图
+        
+        返回:
+            各层图像列表，第0层为原图，之后每层缩小一半
+        """
+        pyramid = [image]
+        for _ in range(self.pyramid_levels):
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        return pyramid
+    
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _load_template_pyramids(image_path: str,
+                                mtime: float,
+                                levels: int) -> Optional[Tuple[Tuple[np.ndarray, ...], Tuple[np.ndarray, ...]]]:
+        """
+        从文件加载模板并缓存其彩色和灰度金字塔
+        
+        参数:
+            image_path: 模板图像路径
+            mtime: 文件的修改时间，文件更新后缓存自动失效
+            levels: 金字塔缩小次数
+        
+        返回:
+            (彩色金字塔, 灰度金字塔)，第0层为原图，加载失败则返回None
+        """
+        tpl = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if tpl is None:
+            return None
+        
+        gray = cv2.cvtColor(tpl, cv2.COLOR_BGR2GRAY)
+        color_pyramid, gray_pyramid = [tpl], [gray]
+        for _ in range(levels):
+            color_pyramid.append(cv2.pyrDown(color_pyramid[-1]))
+            gray_pyramid.append(cv2.pyrDown(gray_pyramid[-1]))
+        return tuple(color_pyramid), tuple(gray_pyramid)
+    
+    def _to_gray(self, image: np.ndarray) -> np.ndarray:
+        """将BGR图像转换为灰度图像，已是灰度图像则直接返回"""
+        if image.ndim == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
     def find_template(self, 
                      image: Union[str, np.ndarray, Image.Image],
@@ -39,7 +267,7 @@ class ImageRecognition:
         
         参数:
             image: 要搜索的图像（文件路径、numpy数组或PIL图像）
-            template: 要查找的模板图像（文件路径、numpy数组或PIL图像）
+            template: 要查找的模板图像（已注册的模板名称、文件路径、numpy数组或PIL图像）
             confidence: 匹配阈值（0-1），None则使用默认值
             region: 搜索区域 (x, y, width, height)，None则搜索整个图像
         
@@ -47,14 +275,37 @@ class ImageRecognition:
             成功则返回匹配区域 (x, y, width, height)，失败则返回None
         """
         try:
+            # 脚本中的区域从JSON读取时为列表，转换为元组后才能作为缓存键
+            if region is not None:
+                region = tuple(region)
+            
             # 加载图像
             img = self._load_image(image)
             if region:
                 x, y, w, h = region
                 img = img[y:y+h, x:x+w]
             
+            # 截图内容与上次相同时直接返回上次的结果；只缓存按名称或路径指定的模板
+            cache_key = None
+            if self.frame_cache_size > 0 and isinstance(template, str):
+                mtime = None if template in self.templates else os.path.getmtime(template)
+                cache_key = (template, mtime, region, confidence)
+                digest = self._frame_digest(img)
+                with self._frame_cache_lock:
+                    cached = self._frame_cache.get(cache_key)
+                    if cached is not None and cached[0] == digest:
+                        self._frame_cache.move_to_end(cache_key)
+                        return cached[1]
+            
             # 加载模板
-            tpl = self._load_image(template)
+            tpl, pyramid = self._resolve_template(template)
+            if tpl is None:
+                return None
+            
+            # 灰度匹配时截图每次都要转换，模板使用预先转换的结果；调试图像仍使用彩色原图
+            color_img = img
+            if self.match_grayscale:
+                img = self._to_gray(img)
             
             # 确保图像大小合适
             if tpl.shape[0] > img.shape[0] or tpl.shape[1] > img.shape[1]:
@@ -65,9 +316,21 @@ class ImageRecognition:
             if confidence is None:
                 confidence = self.match_threshold
             
-            # 执行模板匹配
-            result = cv2.matchTemplate(img, tpl, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            # 执行模板匹配，按模板大小选择可用的金字塔层数，模板太小时直接全图匹配
+            levels = self._usable_pyramid_levels(tpl)
+            if levels > 0:
+                max_val, max_loc = self._match_with_pyramid(img, tpl, confidence, levels, pyramid)
+            elif img.ndim == 2 and min(tpl.shape[:2]) >= self.fft_min_template_size:
+                # 大模板的全图匹配在频域中计算，每次只需对截图做一次DFT
+                dft_key = None
+                if isinstance(template, str):
+                    dft_key = (template, None if template in self.templates else os.path.getmtime(template))
+                result = self._match_with_fft(img, tpl, dft_key)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            else:
+                result = cv2.matchTemplate(img, tpl, cv2.TM_CCOEFF_NORMED)
+                self._suppress_flat_windows(img, tpl, result)
+                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
             
             if max_val >= confidence:
                 # 计算匹配区域
@@ -83,15 +346,429 @@ class ImageRecognition:
                 
                 # 调试模式：保存匹配结果图像
                 if self.debug_mode:
-                    self._save_debug_image(img, match_region, 'template_match')
-                
-                return match_region
+                    self._save_debug_image(color_img, match_region, 'template_match')
             else:
-                return None
+                match_region = None
+            
+            if cache_key is not None:
+                with self._frame_cache_lock:
+                    self._frame_cache[cache_key] = (digest, match_region)
+                    self._frame_cache.move_to_end(cache_key)
+                    while len(self._frame_cache) > self.frame_cache_size:
+                        self._frame_cache.popitem(last=False)
+            
+            return match_region
         except Exception as e:
             logger.error(f"模板匹配失败: {str(e)}")
             return None
     
+    def _frame_digest(self, img: np.ndarray) -> bytes:
+        """
+        计算截图的摘要，用于判断画面是否变化
+        
+        frame_digest_stride大于1时按间隔抽取像素，数据量为原图的1/stride²，
+        但只落在未抽样像素上的变化会检测不到，等待小目标出现时可能一直返回缓存的未找到
+        
+        参数:
+            img: 截图（已按区域裁剪）
+        
+        返回:
+            8字节摘要
+        """
+        stride = self.frame_digest_stride
+        sample = img[::stride, ::stride] if stride > 1 else img
+        digest = hashlib.blake2b(np.ascontiguousarray(sample).data, digest_size=8)
+        digest.update(str(img.shape).encode())
+        return digest.digest()
+    
+    def find_any_template(self,
+                          image: Union[str, np.ndarray, Image.Image],
+                          templates: List[Union[str, np.ndarray, Image.Image]],
+                          confidence: float = None,
+                          region: Optional[Tuple[int, int, int, int]] = None) -> List[Optional[Tuple[int, int, int, int]]]:
+        """
+        在同一张图像中查找多个模板，截图的加载、裁剪、灰度转换和预处理只做一次
+        
+        可以使用金字塔的模板共享截图的金字塔；其余模板共享截图的积分图和平方积分图，
+        每个模板只需做一次互相关（TM_CCORR），归一化所需的窗口和与平方和由积分图直接求出
+        
+        参数:
+            image: 要搜索的图像（文件路径、numpy数组或PIL图像）
+            templates: 要查找的模板列表（已注册的模板名称、文件路径、numpy数组或PIL图像）
+            confidence: 匹配阈值（0-1），None则使用默认值
+            region: 搜索区域 (x, y, width, height)，None则搜索整个图像
+        
+        返回:
+            与templates一一对应的匹配区域 (x, y, width, height)，未找到的为None
+        """
+        matches: List[Optional[Tuple[int, int, int, int]]] = [None] * len(templates)
+        
+        try:
+            # 加载图像
+            img = self._load_image(image)
+            if region:
+                x, y, w, h = region
+                img = img[y:y+h, x:x+w]
+            
+            if self.match_grayscale:
+                img = self._to_gray(img)
+            
+            if confidence is None:
+                confidence = self.match_threshold
+            
+            img_pyramid = None
+            integrals = None
+            
+            for index, template in enumerate(templates):
+                tpl, pyramid = self._resolve_template(template)
+                if tpl is None:
+                    continue
+                
+                if tpl.shape[0] > img.shape[0] or tpl.shape[1] > img.shape[1]:
+                    logger.error("模板图像大于搜索图像")
+                    continue
+                
+                levels = self._usable_pyramid_levels(tpl)
+                if levels > 0:
+                    # 截图金字塔按需扩展，所有模板共享
+                    if img_pyramid is None:
+                        img_pyramid = [img]
+                    while len(img_pyramid) <= levels:
+                        img_pyramid.append(cv2.pyrDown(img_pyramid[-1]))
+                    max_val, max_loc = self._match_with_pyramid(img, tpl, confidence, levels, pyramid, img_pyramid)
+                else:
+                    if integrals is None:
+                        integrals = cv2.integral2(img, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+                    result = self._match_with_integrals(img, tpl, *integrals)
+                    self._suppress_flat_windows(img, tpl, result, integrals)
+                    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+                
+                if max_val >= confidence:
+                    x, y = max_loc
+                    if region:
+                        x += region[0]
+                        y += region[1]
+                    matches[index] = (x, y, tpl.shape[1], tpl.shape[0])
+        except Exception as e:
+            logger.error(f"多模板匹配失败: {str(e)}")
+        
+        return matches
+    
+    def _match_with_fft(self,
+                        img: np.ndarray,
+                        tpl: np.ndarray,
+                        cache_key: Optional[tuple]) -> np.ndarray:
+        """
+        用DFT计算灰度图像的TM_CCOEFF_NORMED匹配结果
+        
+        模板先去均值，其与截图的互相关即为分子；截图补零到最优DFT尺寸后做循环相关，
+        有效区域内的结果不会发生回绕
+        
+        参数:
+            img: 灰度截图
+            tpl: 灰度模板
+            cache_key: 模板频谱的缓存键，None则不缓存
+        
+        返回:
+            匹配得分图，形状为 (H - h + 1, W - w + 1)
+        """
+        img_h, img_w = img.shape[:2]
+        h, w = tpl.shape[:2]
+        rows = cv2.getOptimalDFTSize(img_h)
+        cols = cv2.getOptimalDFTSize(img_w)
+        
+        spectrum, tpl_norm = self._get_template_dft(tpl, cache_key, rows, cols)
+        
+        padded = np.zeros((rows, cols), dtype=np.float32)
+        padded[:img_h, :img_w] = img
+        img_dft = cv2.dft(padded, flags=cv2.DFT_COMPLEX_OUTPUT)
+        corr = cv2.idft(cv2.mulSpectrums(img_dft, spectrum, 0, conjB=True),
+                        flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)
+        numerator = corr[:img_h - h + 1, :img_w - w + 1].astype(np.float64)
+        
+        # 每个匹配位置对应窗口的方差（乘以像素数）
+        n = h * w
+        integrals = cv2.integral2(img, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        sums, sqsums = integrals
+        win_sum = sums[h:, w:] - sums[:-h, w:] - sums[h:, :-w] + sums[:-h, :-w]
+        win_sq = sqsums[h:, w:] - sqsums[:-h, w:] - sqsums[h:, :-w] + sqsums[:-h, :-w]
+        img_var = win_sq - np.square(win_sum) / n
+        
+        denominator = np.sqrt(np.maximum(img_var, 0)) * tpl_norm
+        result = np.zeros_like(numerator, dtype=np.float32)
+        np.divide(numerator, denominator, out=result, where=denominator > 1e-6, casting='unsafe')
+        self._suppress_flat_windows(img, tpl, result, integrals)
+        return result
+    
+    def _get_template_dft(self,
+                          tpl: np.ndarray,
+                          cache_key: Optional[tuple],
+                          rows: int,
+                          cols: int) -> Tuple[np.ndarray, float]:
+        """
+        计算（或从缓存中取出）去均值后模板补零到指定尺寸的频谱
+        
+        参数:
+            tpl: 灰度模板
+            cache_key: 缓存键，None则不缓存
+            rows: 频谱行数
+            cols: 频谱列数
+        
+        返回:
+            (模板频谱, 去均值后模板的范数)
+        """
+        key = None
+        if cache_key is not None and self.fft_cache_size > 0:
+            key = cache_key + (rows, cols)
+            with self._frame_cache_lock:
+                cached = self._tpl_dft_cache.get(key)
+                if cached is not None:
+                    self._tpl_dft_cache.move_to_end(key)
+                    return cached
+        
+        centered = tpl.astype(np.float32)
+        centered -= centered.mean()
+        padded = np.zeros((rows, cols), dtype=np.float32)
+        padded[:tpl.shape[0], :tpl.shape[1]] = centered
+        entry = (cv2.dft(padded, flags=cv2.DFT_COMPLEX_OUTPUT), float(np.sqrt(np.square(centered, dtype=np.float64).sum())))
+        
+        if key is not None:
+            with self._frame_cache_lock:
+                self._tpl_dft_cache[key] = entry
+                while len(self._tpl_dft_cache) > self.fft_cache_size:
+                    self._tpl_dft_cache.popitem(last=False)
+        return entry
+    
+    def _match_with_integrals(self,
+                              img: np.ndarray,
+                              tpl: np.ndarray,
+                              sums: np.ndarray,
+                              sqsums: np.ndarray) -> np.ndarray:
+        """
+        使用截图的积分图计算TM_CCOEFF_NORMED匹配结果
+        
+        分子为互相关减去模板均值与窗口和的乘积，分母由窗口和、窗口平方和及模板方差求出，
+        多通道图像按通道分别去均值后求和，与cv2.TM_CCOEFF_NORMED一致
+        
+        参数:
+            img: 要搜索的图像
+            tpl: 模板图像（通道数与img相同）
+            sums: img的积分图（CV_64F）
+            sqsums: img的平方积分图（CV_64F）
+        
+        返回:
+            匹配得分图，形状为 (H - h + 1, W - w + 1)
+        """
+        h, w = tpl.shape[:2]
+        n = h * w
+        
+        ccorr = cv2.matchTemplate(img, tpl, cv2.TM_CCORR).astype(np.float64)
+        
+        # 每个匹配位置对应窗口的像素和与平方和
+        win_sum = sums[h:, w:] - sums[:-h, w:] - sums[h:, :-w] + sums[:-h, :-w]
+        win_sq = sqsums[h:, w:] - sqsums[:-h, w:] - sqsums[h:, :-w] + sqsums[:-h, :-w]
+        
+        tplf = tpl.astype(np.float64)
+        tpl_sum = tplf.sum(axis=(0, 1))
+        tpl_var = float(np.sum(np.square(tplf).sum(axis=(0, 1)) - np.square(tpl_sum) / n))
+        
+        # 互相关已按通道求和，去均值项和窗口方差也按通道求和
+        img_var = win_sq - np.square(win_sum) / n
+        mean_term = win_sum * (tpl_sum / n)
+        if img.ndim == 3:
+            img_var = img_var.sum(axis=2)
+            mean_term = mean_term.sum(axis=2)
+        numerator = ccorr - mean_term
+        
+        denominator = np.sqrt(np.maximum(img_var, 0) * tpl_var)
+        result = np.zeros_like(numerator, dtype=np.float32)
+        np.divide(numerator, denominator, out=result, where=denominator > 1e-6, casting='unsafe')
+        return result
+    
+    def _suppress_flat_windows(self,
+                               img: np.ndarray,
+                               tpl: np.ndarray,
+                               result: np.ndarray,
+                               integrals: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> None:
+        """
+        将平坦窗口处的匹配得分置零（原地修改）
+        
+        TM_CCOEFF_NORMED的分母在方差接近0的窗口上趋于0，纯色区域容易得到虚高的得分；
+        窗口标准差由积分图求出。模板本身平坦时不做过滤
+        
+        参数:
+            img: 搜索的图像
+            tpl: 模板图像
+            result: img与tpl的TM_CCOEFF_NORMED匹配结果
+            integrals: img的积分图和平方积分图（CV_64F），None则在此计算
+        """
+        threshold = self.flat_stddev_threshold
+        if threshold <= 0 or float(tpl.std()) < threshold:
+            return
+        
+        h, w = tpl.shape[:2]
+        n = h * w
+        if integrals is None:
+            integrals = cv2.integral2(img, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        sums, sqsums = integrals
+        win_sum = sums[h:, w:] - sums[:-h, w:] - sums[h:, :-w] + sums[:-h, :-w]
+        win_sq = sqsums[h:, w:] - sqsums[:-h, w:] - sqsums[h:, :-w] + sqsums[:-h, :-w]
+        variance = win_sq / n - np.square(win_sum / n)
+        if variance.ndim == 3:
+            variance = variance.mean(axis=2)
+        result[variance < threshold * threshold] = 0
+    
+    def _resolve_template(self,
+                          template: Union[str, np.ndarray, Image.Image]) -> Tuple[Optional[np.ndarray], Optional[List[np.ndarray]]]:
+        """
+        加载模板，已注册的模板和模板文件都直接使用缓存的金字塔
+        
+        参数:
+            template: 已注册的模板名称、文件路径、numpy数组或PIL图像
+        
+        返回:
+            (模板图像, 模板金字塔)，灰度匹配时均为灰度图像；没有缓存的金字塔时为None，加载失败时模板为None
+        """
+        pyramid = None
+        if isinstance(template, str) and template in self.templates:
+            pyramids = self._gray_pyramids if self.match_grayscale else self._template_pyramids
+            pyramid = pyramids.get(template)
+            tpl = pyramid[0] if pyramid else self.templates[template]
+        elif isinstance(template, str):
+            pyramids = self._load_template_pyramids(template, os.path.getmtime(template), self.pyramid_levels)
+            if pyramids is None:
+                logger.error(f"无法加载模板图像: {template}")
+                return None, None
+            pyramid = list(pyramids[1] if self.match_grayscale else pyramids[0])
+            tpl = pyramid[0]
+        else:
+            tpl = self._load_image(template)
+        
+        if self.match_grayscale:
+            tpl = self._to_gray(tpl)
+        return tpl, pyramid
+    
+    def _usable_pyramid_levels(self, tpl: np.ndarray) -> int:
+        """
+        按模板大小计算可用的金字塔层数，保证缩小后的模板边长不小于pyramid_min_template_size
+        
+        参数:
+            tpl: 模板图像
+        
+        返回:
+            可用的缩小次数，0表示不使用金字塔
+        """
+        levels = self.pyramid_levels
+        while levels > 0 and (min(tpl.shape[:2]) >> levels) < self.pyramid_min_template_size:
+            levels -= 1
+        return levels
+    
+    def _match_with_pyramid(self,
+                            img: np.ndarray,
+                            tpl: np.ndarray,
+                            confidence: float,
+                            levels: int,
+                            tpl_pyramid: Optional[List[np.ndarray]] = None,
+                            img_pyramid: Optional[List[np.ndarray]] = None) -> Tuple[float, Optional[Tuple[int, int]]]:
+        """
+        使用图像金字塔进行由粗到细的模板匹配
+        
+        先在缩小levels次的图像上整体匹配，最高得分低于confidence * pyramid_prefilter_ratio时直接返回；
+        否则取得分最高的至多pyramid_refine_candidates个互不重叠的候选位置，逐个逐层放大，
+        每一层只在上一层匹配位置放大后附近的小窗口内重新匹配，返回原图上得分最高的结果。
+        缩小后的图像丢失了细节，相似的干扰图案可能在缩小的图像上得分更高，因此不只细化最高的一个位置
+        
+        参数:
+            img: 要搜索的图像
+            tpl: 模板图像
+            confidence: 匹配阈值
+            levels: 缩小次数
+            tpl_pyramid: 预先计算的模板金字塔（至少levels + 1层），None则在此构建
+            img_pyramid: 预先计算的图像金字塔（至少levels + 1层），None则在此构建
+        
+        返回:
+            (最高得分, 匹配位置)，预筛选未通过时匹配位置为None
+        """
+        if img_pyramid is None or len(img_pyramid) <= levels:
+            img_pyramid = [img]
+            for _ in range(levels):
+                img_pyramid.append(cv2.pyrDown(img_pyramid[-1]))
+        
+        if tpl_pyramid is None or len(tpl_pyramid) <= levels:
+            tpl_pyramid = [tpl]
+            for _ in range(levels):
+                tpl_pyramid.append(cv2.pyrDown(tpl_pyramid[-1]))
+        
+        result = cv2.matchTemplate(img_pyramid[levels], tpl_pyramid[levels], cv2.TM_CCOEFF_NORMED)
+        self._suppress_flat_windows(img_pyramid[levels], tpl_pyramid[levels], result)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        
+        prefilter = confidence * self.pyramid_prefilter_ratio
+        if max_val < prefilter:
+            return max_val, None
+        
+        # 依次取出得分最高的候选位置，每取出一个就将其周围一个模板大小的范围置为最低分，避免重复细化同一处
+        coarse_h, coarse_w = tpl_pyramid[levels].shape[:2]
+        candidates = []
+        while True:
+            candidates.append(max_loc)
+            if len(candidates) >= self.pyramid_refine_candidates:
+                break
+            x, y = max_loc
+            result[max(0, y - coarse_h + 1):y + coarse_h, max(0, x - coarse_w + 1):x + coarse_w] = -1
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            if max_val < prefilter:
+                break
+        
+        best_val, best_loc = -1.0, None
+        for loc in candidates:
+            val, loc = self._refine_pyramid_match(img_pyramid, tpl_pyramid, levels, loc)
+            if val > best_val:
+                best_val, best_loc = val, loc
+                if best_val >= 1.0 - 1e-6:
+                    break
+        
+        return best_val, best_loc
+    
+    def _refine_pyramid_match(self,
+                              img_pyramid: List[np.ndarray],
+                              tpl_pyramid: List[np.ndarray],
+                              levels: int,
+                              max_loc: Tuple[int, int]) -> Tuple[float, Tuple[int, int]]:
+        """
+        将缩小levels次的图像上的一个候选位置逐层细化到原图
+        
+        参数:
+            img_pyramid: 图像金字塔（至少levels + 1层）
+            tpl_pyramid: 模板金字塔（至少levels + 1层）
+            levels: 候选位置所在的层
+            max_loc: 候选位置
+        
+        返回:
+            (原图上的得分, 原图上的匹配位置)
+        """
+        # 逐层细化，窗口在模板四周各留出margin像素，容纳缩放带来的位置误差
+        margin = self.pyramid_refine_margin
+        match_template = cv2.matchTemplate
+        min_max_loc = cv2.minMaxLoc
+        max_val = -1.0
+        for level in range(levels - 1, -1, -1):
+            level_img = img_pyramid[level]
+            level_tpl = tpl_pyramid[level]
+            img_h, img_w = level_img.shape[:2]
+            tpl_h, tpl_w = level_tpl.shape[:2]
+            
+            x0 = max(0, min(max_loc[0] * 2 - margin, img_w - tpl_w))
+            y0 = max(0, min(max_loc[1] * 2 - margin, img_h - tpl_h))
+            x1 = min(img_w, max_loc[0] * 2 + tpl_w + margin)
+            y1 = min(img_h, max_loc[1] * 2 + tpl_h + margin)
+            
+            result = match_template(level_img[y0:y1, x0:x1], level_tpl, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, loc = min_max_loc(result)
+            max_loc = (loc[0] + x0, loc[1] + y0)
+        
+        return max_val, max_loc
+    
     def find_text(self,
                   image: Union[str, np.ndarray, Image.Image],
                   text: str,
@@ -107,6 +784,23 @@ class ImageRecognition:
         返回:
             成功则返回文本区域 (x, y, width, height)，失败则返回None
         """
+        return self.find_texts(image, [text], region)[0]
+    
+    def find_texts(self,
+                   image: Union[str, np.ndarray, Image.Image],
+                   texts: List[str],
+                   region: Optional[Tuple[int, int, int, int]] = None) -> List[Optional[Tuple[int, int, int, int]]]:
+        """
+        在图像中同时查找多个文本，只执行一次OCR
+        
+        参数:
+            image: 要搜索的图像（文件路径、numpy数组或PIL图像）
+            texts: 要查找的文本列表
+            region: 搜索区域 (x, y, width, height)，None则搜索整个图像
+        
+        返回:
+            与texts一一对应的文本区域 (x, y, width, height)，未找到的为None
+        """
         try:
             # 加载图像
             img = self._load_image(image)
@@ -114,44 +808,65 @@ class ImageRecognition:
                 x, y, w, h = region
                 img = img[y:y+h, x:x+w]
             
-            # 转换为PIL图像
-            if isinstance(img, np.ndarray):
-                img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            # 只做一次灰度转换，不再构造RGB副本
+            gray = self._to_gray(img)
             
             # 执行OCR
-            result = pytesseract.image_to_data(
-                img,
-                lang=self.ocr_lang,
-                output_type=pytesseract.Output.DICT
-            )
+            result = self._run_ocr(gray, 'data')
             
             # 查找匹配的文本
-            text = text.lower()
-            for i, word in enumerate(result['text']):
-                if text in word.lower():
-                    # 获取文本区域
-                    x = result['left'][i]
-                    y = result['top'][i]
-                    w = result['width'][i]
-                    h = result['height'][i]
-                    
-                    if region:
-                        # 如果指定了搜索区域，需要调整返回的坐标
-                        x += region[0]
-                        y += region[1]
-                    
-                    text_region = (x, y, w, h)
-                    
-                    # 调试模式：保存匹配结果图像
-                    if self.debug_mode:
-                        self._save_debug_image(img, text_region, 'text_match')
-                    
-                    return text_region
+            matches = []
+            for i in self._scan_ocr_words(result['text'], texts):
+                if i < 0:
+                    matches.append(None)
+                    continue
+                
+                # 获取文本区域
+                x = result['left'][i]
+                y = result['top'][i]
+                w = result['width'][i]
+                h = result['height'][i]
+                
+                if region:
+                    # 如果指定了搜索区域，需要调整返回的坐标
+                    x += region[0]
+                    y += region[1]
+                
+                text_region = (x, y, w, h)
+                
+                # 调试模式：保存匹配结果图像
+                if self.debug_mode:
+                    self._save_debug_image(img, text_region, 'text_match')
+                
+                matches.append(text_region)
             
-            return None
+            return matches
         except Exception as e:
             logger.error(f"文本识别失败: {str(e)}")
-            return None
+            return [None] * len(texts)
+    
+    def _scan_ocr_words(self, words: List[str], texts: List[str]) -> List[int]:
+        """
+        在OCR识别出的单词中查找每个文本第一次出现的位置（不区分大小写的子串匹配）
+        
+        单词列表只转换一次小写，每个文本的查找由numpy.char对整个数组一次完成
+        
+        参数:
+            words: OCR识别出的单词列表
+            texts: 要查找的文本列表
+        
+        返回:
+            每个文本第一个匹配单词的索引，未找到为-1
+        """
+        if not words:
+            return [-1] * len(texts)
+        
+        lowered = np.char.lower(np.asarray(words, dtype=str))
+        indices = []
+        for text in texts:
+            hits = np.flatnonzero(np.char.find(lowered, text.lower()) >= 0)
+            indices.append(int(hits[0]) if hits.size else -1)
+        return indices
     
     def get_text(self,
                  image: Union[str, np.ndarray, Image.Image],
@@ -173,17 +888,115 @@ class ImageRecognition:
                 x, y, w, h = region
                 img = img[y:y+h, x:x+w]
             
-            # 转换为PIL图像
-            if isinstance(img, np.ndarray):
-                img = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+            # 只做一次灰度转换，不再构造RGB副本
+            gray = self._to_gray(img)
             
             # 执行OCR
-            text = pytesseract.image_to_string(img, lang=self.ocr_lang)
+            text = self._run_ocr(gray, 'string')
             return text.strip()
         except Exception as e:
             logger.error(f"文本识别失败: {str(e)}")
             return ""
     
+    def _run_ocr(self, gray: np.ndarray, kind: str) -> Any:
+        """
+        对灰度图像执行OCR，相同内容的图像直接返回缓存的结果
+        
+        参数:
+            gray: 灰度图像
+            kind: 'data'返回image_to_data的字典，'string'返回image_to_string的文本
+        
+        返回:
+            OCR结果
+        """
+        # 已是连续内存时不复制；缓存摘要和PIL视图都需要连续的缓冲区
+        gray = np.ascontiguousarray(gray)
+        
+        key = None
+        if self.ocr_cache_size > 0:
+            digest = hashlib.blake2b(gray.data, digest_size=8)
+            digest.update(f"{gray.shape}|{self.ocr_lang}|{kind}".encode())
+            key = digest.digest()
+            
+            with self._ocr_cache_lock:
+                result = self._ocr_cache.get(key)
+                if result is not None:
+                    self._ocr_cache.move_to_end(key)
+                    return result
+        
+        # 以灰度缓冲区的视图构造PIL图像，不复制像素
+        pil_image = Image.frombuffer("L", (gray.shape[1], gray.shape[0]), gray, "raw", "L", 0, 1)
+        
+        if self.use_tesserocr:
+            result = self._run_tesserocr(pil_image, kind)
+        elif kind == 'data':
+            result = pytesseract.image_to_data(pil_image, lang=self.ocr_lang, output_type=pytesseract.Output.DICT)
+        else:
+            result = pytesseract.image_to_string(pil_image, lang=self.ocr_lang)
+        
+        if key is not None:
+            with self._ocr_cache_lock:
+                self._ocr_cache[key] = result
+                while len(self._ocr_cache) > self.ocr_cache_size:
+                    self._ocr_cache.popitem(last=False)
+        
+        return result
+    
+    def _tess_api(self) -> Any:
+        """
+        获取当前线程的tesserocr API对象，识别语言变化时重新创建
+        
+        返回:
+            PyTessBaseAPI对象
+        """
+        api = getattr(self._tess_local, 'api', None)
+        if api is not None and self._tess_local.lang == self.ocr_lang:
+            return api
+        
+        if api is not None:
+            api.End()
+        if self.tessdata_path:
+            api = PyTessBaseAPI(path=self.tessdata_path, lang=self.ocr_lang)
+        else:
+            api = PyTessBaseAPI(lang=self.ocr_lang)
+        self._tess_local.api = api
+        self._tess_local.lang = self.ocr_lang
+        return api
+    
+    def _run_tesserocr(self, image: Image.Image, kind: str) -> Any:
+        """
+        使用常驻的tesserocr API执行OCR，结果格式与pytesseract相同
+        
+        参数:
+            image: 灰度PIL图像
+            kind: 'data'返回包含text/left/top/width/height列表的字典，'string'返回文本
+        
+        返回:
+            OCR结果
+        """
+        api = self._tess_api()
+        api.SetImage(image)
+        
+        if kind != 'data':
+            return api.GetUTF8Text()
+        
+        result: Dict[str, List[Any]] = {'text': [], 'left': [], 'top': [], 'width': [], 'height': []}
+        api.Recognize()
+        iterator = api.GetIterator()
+        if iterator is None:
+            return result
+        for word in iterate_level(iterator, RIL.WORD):
+            box = word.BoundingBox(RIL.WORD)
+            if box is None:
+                continue
+            x1, y1, x2, y2 = box
+            result['text'].append(word.GetUTF8Text(RIL.WORD) or '')
+            result['left'].append(x1)
+            result['top'].append(y1)
+            result['width'].append(x2 - x1)
+            result['height'].append(y2 - y1)
+        return result
+    
     def _load_image(self, image: Union[str, np.ndarray, Image.Image]) -> np.ndarray:
         """
         加载图像
@@ -198,7 +1011,9 @@ class ImageRecognition:
             # 从文件加载
             return cv2.imread(image)
         elif isinstance(image, np.ndarray):
-            # 已经是numpy数组
+            # 已经是numpy数组，BGRA数组（如mss的原始缓冲区）只取前三个通道的视图，不复制
+            if image.ndim == 3 and image.shape[2] == 4:
+                return image[:, :, :3]
             return image
         elif isinstance(image, Image.Image):
             # 从PIL图像转换
@@ -220,24 +1035,28 @@ class ImageRecognition:
         """
         try:
             # 创建调试图像目录
-            debug_dir = os.path.join(config.get('paths.debug', 'debug'), 'image_recognition')
-            os.makedirs(debug_dir, exist_ok=True)
-            
-            # 复制图像
-            debug_img = image.copy()
+            if not self._debug_dir_ready:
+                os.makedirs(self._debug_dir, exist_ok=True)
+                self._debug_dir_ready = True
             
-            # 绘制矩形标记
-            x, y, w, h = region
-            cv2.rectangle(debug_img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            # 后台队列已满时丢弃本张
+            if not _debug_slots.acquire(blocking=False):
+                logger.debug("调试图像保存积压，丢弃本张")
+                return
             
-            # 保存图像
-            import time
-            timestamp = time.strftime('%Y%m%d_%H%M%S')
-            filename = f"{prefix}_{timestamp}.png"
-            filepath = os.path.join(debug_dir, filename)
+            now = int(time.time())
+            if now != self._debug_stamp_time:
+                self._debug_stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(now))
+                self._debug_stamp_time = now
+            filename = f"{prefix}_{self._debug_stamp}_{next(self._debug_counter):06d}.png"
+            filepath = os.path.join(self._debug_dir, filename)
             
-            cv2.imwrite(filepath, debug_img)
-            logger.debug(f"保存调试图像: {filepath}")
+            # 截图缓冲区可能被复用，先复制图像，绘制和编码在后台线程中进行
+            try:
+                _debug_pool.submit(_write_debug_image, filepath, image.copy(), region)
+            except Exception:
+                _debug_slots.release()
+                raise
         except Exception as e:
             logger.error(f"保存调试图像失败: {str(e)}")
 
@@ -3,6 +3,6 @@
 提供日志记录和管理功能
 """
 
-from .logger_setup import init_logging, get_logger
+from .logger_setup import init_logging, get_logger, buffer_handler, disable_unused_record_fields
 
-__all__ = ['init_logging', 'get_logger']
\ No newline at end of file
+__all__ = ['init_logging', 'get_logger', 'buffer_handler', 'disable_unused_record_fields']
\ No newline at end of file
@@ -4,6 +4,7 @@
 """
 
 import logging
+from logging.handlers import MemoryHandler
 from typing import List, Optional, Union
 
 def init_logging(
@@ -50,6 +51,42 @@ def init_logging(
     # 记录初始化完成
     root_logger.debug("日志系统初始化完成")
 
+def buffer_handler(
+    handler: logging.Handler,
+    capacity: int = 32,
+    flush_level: int = logging.WARNING
+) -> logging.Handler:
+    """
+    用内存缓冲包装日志处理器，日志记录攒满一批后再一起写出
+    
+    文件处理器每条记录都要刷新（轮转处理器还要检查文件大小），缓冲后只在批量写出时才访问文件；
+    达到flush_level的记录会立即连同之前缓冲的记录一起写出，程序退出时logging会写出剩余记录
+    
+    参数:
+        handler: 要包装的处理器
+        capacity: 缓冲的记录条数，不大于0则不缓冲，直接返回原处理器
+        flush_level: 立即写出的最低日志级别
+    
+    返回:
+        logging.Handler: 包装后的处理器
+    """
+    if capacity <= 0:
+        return handler
+    return MemoryHandler(capacity, flushLevel=flush_level, target=handler)
+
+def disable_unused_record_fields(log_format: str) -> None:
+    """
+    日志格式中没有用到线程和进程信息时，不再为每条记录查询这些信息
+    
+    参数:
+        log_format: 日志格式字符串
+    """
+    if 'thread' not in log_format:
+        logging.logThreads = False
+    if 'process' not in log_format:
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
 def get_logger(name: str) -> logging.Logger:
     """
     获取指定名称的日志记录器
@@ -25,6 +25,7 @@ def init_logging():
     
     # 设置日志格式
     log_format = config.get("log_format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger_setup.disable_unused_record_fields(log_format)
     
     # 设置日志处理器
     handlers = []
@@ -50,7 +51,10 @@ def init_logging():
             encoding='utf-8'
         )
         file_handler.setFormatter(logging.Formatter(log_format))
-        handlers.append(file_handler)
+        
+        # 文件日志缓冲写出，警告及以上级别的日志立即写出
+        buffer_capacity = config.get("log_buffer_capacity", 32)
+        handlers.append(logger_setup.buffer_handler(file_handler, buffer_capacity))
     
     # 初始化日志系统
     logger_setup.init_logging(log_level, handlers)
@@ -5,8 +5,12 @@
 
 import os
 import time
+import atexit
+import itertools
 import logging
-from typing import Optional, Tuple, Union, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Union, List, Dict, Any
 from PIL import Image, ImageGrab
 import numpy as np
 
@@ -14,6 +18,27 @@ from config import config
 
 logger = logging.getLogger('ScreenCapture')
 
+# 调试图像在后台线程中编码保存，积压过多时直接丢弃，不阻塞捕获
+_debug_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ScreenCaptureDebug')
+_debug_slots = threading.BoundedSemaphore(16)
+
+
+def _write_debug_image(filepath: str, image: Image.Image) -> None:
+    """
+    保存调试图像（在后台线程中运行）
+    
+    参数:
+        filepath: 保存路径
+        image: 图像对象
+    """
+    try:
+        image.save(filepath, compress_level=1)
+        logger.debug("保存调试图像: %s", filepath)
+    except Exception as e:
+        logger.error(f"保存调试图像失败: {str(e)}")
+    finally:
+        _debug_slots.release()
+
 # 尝试导入mss库，用于更高效的屏幕捕获
 try:
     import mss
@@ -22,29 +47,196 @@ except ImportError:
     MSS_AVAILABLE = False
     logger.warning("未安装mss库，将使用PIL进行屏幕捕获")
 
+# 尝试导入dxcam库，用于Windows上基于DXGI桌面复制的低延迟屏幕捕获
+try:
+    import dxcam
+    DXCAM_AVAILABLE = True
+except ImportError:
+    DXCAM_AVAILABLE = False
+
 # 尝试导入win32gui库，用于Windows窗口捕获
 try:
     import win32gui
     import win32ui
     import win32con
-    from ctypes import windll
+    import ctypes
+    from ctypes import windll, wintypes
     WIN32_AVAILABLE = True
 except ImportError:
     WIN32_AVAILABLE = False
     logger.warning("未安装pywin32库，窗口捕获功能将不可用")
 
+if WIN32_AVAILABLE:
+    class BITMAPINFOHEADER(ctypes.Structure):
+        """GDI位图信息头"""
+        _fields_ = [
+            ('biSize', wintypes.DWORD),
+            ('biWidth', wintypes.LONG),
+            ('biHeight', wintypes.LONG),
+            ('biPlanes', wintypes.WORD),
+            ('biBitCount', wintypes.WORD),
+            ('biCompression', wintypes.DWORD),
+            ('biSizeImage', wintypes.DWORD),
+            ('biXPelsPerMeter', wintypes.LONG),
+            ('biYPelsPerMeter', wintypes.LONG),
+            ('biClrUsed', wintypes.DWORD),
+            ('biClrImportant', wintypes.DWORD),
+        ]
+    
+    class BITMAPINFO(ctypes.Structure):
+        """GDI位图信息"""
+        _fields_ = [('bmiHeader', BITMAPINFOHEADER), ('bmiColors', wintypes.DWORD * 3)]
+    
+    # 单独加载gdi32，设置参数类型（64位句柄）时不影响其他模块使用的windll.gdi32
+    _gdi32 = ctypes.WinDLL('gdi32')
+    _gdi32.GetDIBits.argtypes = [wintypes.HDC, wintypes.HBITMAP, wintypes.UINT, wintypes.UINT,
+                                 ctypes.c_void_p, ctypes.POINTER(BITMAPINFO), wintypes.UINT]
+    _gdi32.GetDIBits.restype = ctypes.c_int
+    
+    _DIB_RGB_COLORS = 0
+    _BI_RGB = 0
+
 
 class ScreenCapture:
     """屏幕捕获类，提供屏幕截图和窗口捕获功能"""
     
     def __init__(self):
         """初始化屏幕捕获"""
+        self.reload_config()
+        
+        # mss对象持有平台相关的句柄，不能跨线程共享，每个线程各自创建一个
+        self._local = threading.local()
+        
+        self._dxgi_camera = None
+        self._dxgi_last = None  # (区域, 帧)，屏幕没有变化时dxcam不返回新帧，复用上一帧
+        
+        # 窗口捕获的GDI资源按窗口句柄缓存：(窗口DC, MFC DC, 内存DC, 位图, (宽, 高), BGRA缓冲区, 位图信息)，窗口大小变化时重建
+        self._win_cache: Dict[int, Tuple[Any, Any, Any, Any, Tuple[int, int], np.ndarray, Any]] = {}
+        self._win_lock = threading.Lock()
+        if WIN32_AVAILABLE:
+            atexit.register(self.release_window_resources)
+        
+        # 调试图像文件名：时间戳每秒最多格式化一次，同一秒内的多张图像用递增序号区分
+        self._debug_counter = itertools.count()
+        self._debug_stamp_time = 0
+        self._debug_stamp = ''
+    
+    def reload_config(self) -> None:
+        """
+        重新读取配置
+        
+        所有配置项只在这里读取并保存为属性，捕获过程中不再查询配置；
+        运行时修改配置后调用此方法生效
+        """
         self.use_mss = MSS_AVAILABLE and config.get('capture.use_mss', True)
         self.debug_mode = config.get('capture.debug_mode', False)
         
-        # 如果使用mss，初始化mss对象
-        if self.use_mss:
-            self.mss = mss.mss()
+        # DXGI桌面复制（仅Windows，需要dxcam库），默认关闭
+        self.use_dxgi = DXCAM_AVAILABLE and config.get('capture.use_dxgi', False)
+        
+        # 调试图像目录，首次保存时创建
+        self._debug_dir = os.path.join(config.get('paths.debug', 'debug'), 'screen_capture')
+        self._debug_dir_ready = False
+    
+    @property
+    def mss(self):
+        """当前线程的mss对象"""
+        sct = getattr(self._local, 'mss', None)
+        if sct is None:
+            sct = self._local.mss = mss.mss()
+        return sct
+    
+    def capture_array(self,
+                      region: Optional[Tuple[int, int, int, int]] = None,
+                      out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        捕获屏幕截图并返回BGR格式的numpy数组，可直接用于OpenCV
+        
+        使用mss时直接复用其BGRA缓冲区，不经过PIL图像转换
+        
+        参数:
+            region: 捕获区域 (x, y, width, height)，None则捕获整个屏幕
+            out: 用于存放结果的预分配数组，尺寸不符时忽略并分配新数组
+        
+        返回:
+            numpy数组格式的图像 (height, width, 3)
+        """
+        try:
+            frame = self._capture_with_dxgi(region) if self.use_dxgi else None
+            
+            if frame is None:
+                if self.use_mss:
+                    if region:
+                        x, y, w, h = region
+                        monitor = {"top": y, "left": x, "width": w, "height": h}
+                    else:
+                        monitor = self.mss.monitors[0]
+                    
+                    screenshot = self.mss.grab(monitor)
+                    frame = np.frombuffer(screenshot.raw, dtype=np.uint8)
+                    frame = frame.reshape(screenshot.height, screenshot.width, 4)[:, :, :3]
+                else:
+                    # PIL返回RGB图像，转换为BGR
+                    frame = np.asarray(self._capture_with_pil(region))[:, :, ::-1]
+            
+            if out is not None and out.shape == frame.shape and out.dtype == np.uint8:
+                np.copyto(out, frame)
+                return out
+            # DXGI的帧会被缓存复用，返回副本以免调用方修改缓存
+            return frame.copy() if self.use_dxgi else np.ascontiguousarray(frame)
+        except Exception as e:
+            logger.error(f"屏幕捕获失败: {str(e)}")
+            return np.zeros((600, 800, 3), dtype=np.uint8)
+    
+    def capture_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> np.ndarray:
+        """
+        捕获屏幕截图到当前线程复用的缓冲区中，返回BGR格式的numpy数组
+        
+        同一线程上捕获区域尺寸不变时每次都写入同一块内存，不再为整屏图像重新分配。
+        返回的数组在当前线程下一次调用时会被覆盖，需要保留时请自行复制
+        
+        参数:
+            region: 捕获区域 (x, y, width, height)，None则捕获整个屏幕
+        
+        返回:
+            numpy数组格式的图像 (height, width, 3)
+        """
+        frame = self.capture_array(region, out=getattr(self._local, 'frame', None))
+        self._local.frame = frame
+        return frame
+    
+    def _capture_with_dxgi(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[np.ndarray]:
+        """
+        使用DXGI桌面复制捕获屏幕，直接得到BGR格式的numpy数组
+        
+        参数:
+            region: 捕获区域 (x, y, width, height)，None则捕获整个屏幕
+        
+        返回:
+            成功则返回BGR图像数组，失败则返回None（调用方改用mss或PIL）
+        """
+        try:
+            if self._dxgi_camera is None:
+                self._dxgi_camera = dxcam.create(output_color="BGR")
+            
+            if region:
+                x, y, w, h = region
+                frame = self._dxgi_camera.grab(region=(x, y, x + w, y + h))
+            else:
+                frame = self._dxgi_camera.grab()
+            
+            # 屏幕内容没有变化时dxcam返回None，复用相同区域的上一帧
+            if frame is None:
+                if self._dxgi_last is not None and self._dxgi_last[0] == region:
+                    return self._dxgi_last[1]
+                return None
+            
+            self._dxgi_last = (region, frame)
+            return frame
+        except Exception as e:
+            logger.error(f"DXGI屏幕捕获失败，改用其他方式: {str(e)}")
+            self.use_dxgi = False
+            return None
     
     def capture(self, region: Optional[Tuple[int, int, int, int]] = None) -> Image.Image:
         """
@@ -75,7 +267,8 @@ class ScreenCapture:
             monitor = self.mss.monitors[0]  # 主显示器
         
         screenshot = self.mss.grab(monitor)
-        img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
+        # 直接读取mss的原始缓冲区（screenshot.bgra会先复制出一份bytes），由raw解码器一次完成BGRX到RGB的转换
+        img = Image.frombuffer("RGB", screenshot.size, screenshot.raw, "raw", "BGRX", 0, 1)
         
         # 调试模式：保存截图
         if self.debug_mode:
@@ -107,6 +300,31 @@ class ScreenCapture:
         返回:
             成功则返回PIL图像对象，失败则返回None
         """
+        with self._win_lock:
+            frame = self._capture_window_locked(window_title)
+            if frame is None:
+                return None
+            
+            # 缓冲区会被下一次捕获覆盖，在持有锁时解码为PIL图像
+            height, width = frame.shape[:2]
+            img = Image.frombuffer('RGB', (width, height), frame, 'raw', 'BGRX', 0, 1)
+        
+        # 调试模式：保存截图
+        if self.debug_mode:
+            self._save_debug_image(img, 'window_capture')
+        
+        return img
+    
+    def _capture_window_locked(self, window_title: str) -> Optional[np.ndarray]:
+        """
+        将窗口内容写入该窗口缓存的BGRA缓冲区，调用方需持有_win_lock
+        
+        参数:
+            window_title: 窗口标题
+        
+        返回:
+            成功则返回缓存的BGRA缓冲区 (height, width, 4)，失败则返回None
+        """
         if not WIN32_AVAILABLE:
             logger.error("未安装pywin32库，无法使用窗口捕获功能")
             return None
@@ -123,41 +341,77 @@ class ScreenCapture:
             width = right - left
             height = bottom - top
             
-            # 创建设备上下文
-            hwndDC = win32gui.GetWindowDC(hwnd)
-            mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-            saveDC = mfcDC.CreateCompatibleDC()
+            # 复用该窗口已创建的设备上下文和位图，大小变化时重建
+            cached = self._win_cache.get(hwnd)
+            if cached is not None and cached[4] != (width, height):
+                self._release_window_cache_entry(hwnd)
+                cached = None
             
-            # 创建位图对象
-            saveBitMap = win32ui.CreateBitmap()
-            saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
-            saveDC.SelectObject(saveBitMap)
+            if cached is None:
+                # 顺便释放已关闭窗口的资源
+                for stale in [h for h in self._win_cache if not win32gui.IsWindow(h)]:
+                    self._release_window_cache_entry(stale)
+                
+                # 创建设备上下文
+                hwndDC = win32gui.GetWindowDC(hwnd)
+                mfcDC = win32ui.CreateDCFromHandle(hwndDC)
+                saveDC = mfcDC.CreateCompatibleDC()
+                
+                # 创建位图对象
+                saveBitMap = win32ui.CreateBitmap()
+                saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
+                saveDC.SelectObject(saveBitMap)
+                
+                # 32位自上而下的DIB格式，与缓冲区的行顺序一致
+                bmi = BITMAPINFO()
+                bmi.bmiHeader.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+                bmi.bmiHeader.biWidth = width
+                bmi.bmiHeader.biHeight = -height
+                bmi.bmiHeader.biPlanes = 1
+                bmi.bmiHeader.biBitCount = 32
+                bmi.bmiHeader.biCompression = _BI_RGB
+                buffer = np.empty((height, width, 4), dtype=np.uint8)
+                
+                cached = (hwndDC, mfcDC, saveDC, saveBitMap, (width, height), buffer, bmi)
+                self._win_cache[hwnd] = cached
             
-            # 复制窗口内容到位图
-            result = windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 0)
+            hwndDC, mfcDC, saveDC, saveBitMap, _, buffer, bmi = cached
             
-            # 转换为PIL图像
-            bmpinfo = saveBitMap.GetInfo()
-            bmpstr = saveBitMap.GetBitmapBits(True)
-            img = Image.frombuffer(
-                'RGB',
-                (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
-                bmpstr, 'raw', 'BGRX', 0, 1)
+            # 复制窗口内容到位图，再由GetDIBits直接写入缓冲区，不经过bytes对象
+            hdc = saveDC.GetSafeHdc()
+            windll.user32.PrintWindow(hwnd, hdc, 0)
+            lines = _gdi32.GetDIBits(hdc, saveBitMap.GetHandle(), 0, height,
+                                     buffer.ctypes.data, ctypes.byref(bmi), _DIB_RGB_COLORS)
+            if lines != height:
+                logger.error("窗口捕获失败: 读取位图数据失败")
+                return None
             
-            # 清理资源
+            return buffer
+        except Exception as e:
+            logger.error(f"窗口捕获失败: {str(e)}")
+            return None
+    
+    def _release_window_cache_entry(self, hwnd: int) -> None:
+        """
+        释放指定窗口缓存的GDI资源，调用方需持有_win_lock
+        
+        参数:
+            hwnd: 窗口句柄
+        """
+        hwndDC, mfcDC, saveDC, saveBitMap = self._win_cache.pop(hwnd)[:4]
+        try:
             win32gui.DeleteObject(saveBitMap.GetHandle())
             saveDC.DeleteDC()
             mfcDC.DeleteDC()
             win32gui.ReleaseDC(hwnd, hwndDC)
-            
-            # 调试模式：保存截图
-            if self.debug_mode:
-                self._save_debug_image(img, 'window_capture')
-            
-            return img
         except Exception as e:
-            logger.error(f"窗口捕获失败: {str(e)}")
-            return None
+            logger.error(f"释放窗口捕获资源失败: {str(e)}")
+    
+    def release_window_resources(self) -> None:
+        """释放所有窗口捕获缓存的GDI资源（程序退出时自动调用）"""
+        with self._win_lock:
+            for hwnd in list(self._win_cache):
+                self._release_window_cache_entry(hwnd)
     
     def get_window_position(self, window_title: str) -> Optional[Tuple[int, int, int, int]]:
         """
@@ -227,16 +481,29 @@ class ScreenCapture:
         """
         try:
             # 创建调试图像目录
-            debug_dir = os.path.join(config.get('paths.debug', 'debug'), 'screen_capture')
-            os.makedirs(debug_dir, exist_ok=True)
+            if not self._debug_dir_ready:
+                os.makedirs(self._debug_dir, exist_ok=True)
+                self._debug_dir_ready = True
             
             # 保存图像
-            timestamp = time.strftime('%Y%m%d_%H%M%S')
-            filename = f"{prefix}_{timestamp}.png"
-            filepath = os.path.join(debug_dir, filename)
+            now = int(time.time())
+            if now != self._debug_stamp_time:
+                self._debug_stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(now))
+                self._debug_stamp_time = now
+            filename = f"{prefix}_{self._debug_stamp}_{next(self._debug_counter):06d}.png"
+            filepath = os.path.join(self._debug_dir, filename)
+            
+            # 后台队列已满时丢弃本张
+            if not _debug_slots.acquire(blocking=False):
+                logger.debug("调试图像保存积压，丢弃本张")
+                return
             
-            image.save(filepath)
-            logger.debug(f"保存调试图像: {filepath}")
+            # 调用方可能继续修改返回的图像，先复制再交给后台线程编码
+            try:
+                _debug_pool.submit(_write_debug_image, filepath, image.copy())
+            except Exception:
+                _debug_slots.release()
+                raise
         except Exception as e:
             logger.error(f"保存调试图像失败: {str(e)}")
 
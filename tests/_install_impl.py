@@ -0,0 +1,297 @@
+"""
+安装测试的实现
+
+由test_installation.py在直接运行时导入，测试发现工具导入test_installation.py时不会加载本模块
+"""
+
+import os
+import sys
+from typing import NamedTuple
+
+# 添加父目录到系统路径，以便导入src包
+# pytest等工具可能已经以其他形式（相对路径、末尾带分隔符等）添加过，规范化后比较，不重复添加
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if not any(os.path.normcase(os.path.abspath(entry or os.curdir)) == os.path.normcase(PROJECT_ROOT)
+           for entry in sys.path):
+    sys.path.append(PROJECT_ROOT)
+
+def parse_version(version):
+    """
+    将版本号解析为整数元组，用于正确比较（如"10.0.0"大于"9.0.0"）
+    
+    按点分隔，取每段开头的数字，遇到不以数字开头的段为止（"1.20.0rc1"解析为(1, 20, 0)）；
+    最低版本都是x.y.z形式，不必为此导入packaging。无法解析时返回None
+    """
+    parts = []
+    for part in str(version).split("."):
+        digits = ""
+        for char in part:
+            if not char.isdigit():
+                break
+            digits += char
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts) if parts else None
+
+# 依赖项：(发行包名称, 模块名称, 最低版本)，最低版本在导入时解析一次
+DEPENDENCIES = tuple(
+    (dist_name, module_name, parse_version(min_version))
+    for dist_name, module_name, min_version in (
+        ("opencv-python", "cv2", "4.5.0"),
+        ("numpy", "numpy", "1.19.0"),
+        ("Pillow", "PIL", "8.0.0"),
+        ("pyautogui", "pyautogui", "0.9.50"),
+        ("pynput", "pynput", "1.7.0"),
+        ("pytesseract", "pytesseract", "0.3.0"),
+    )
+)
+
+class CheckResult(NamedTuple):
+    """检查结果"""
+    ok: bool
+    message: str
+
+def _cached_import(module_name):
+    """导入模块，已导入的模块直接从sys.modules返回"""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    import importlib
+    return importlib.import_module(module_name)
+
+def find_module_spec(module_name):
+    """
+    查找模块，不执行模块代码
+    
+    直接使用PathFinder逐级查找，父包只查找不导入（importlib.util.find_spec会先导入父包）；
+    PathFinder找不到时（内置模块、冻结模块等）再交给importlib.util.find_spec
+    """
+    from importlib.machinery import PathFinder
+    
+    path = None
+    spec = None
+    parts = module_name.split(".")
+    for index in range(len(parts)):
+        spec = PathFinder.find_spec(".".join(parts[:index + 1]), path)
+        if spec is None:
+            break
+        path = spec.submodule_search_locations
+        if path is None and index < len(parts) - 1:
+            spec = None
+            break
+    
+    if spec is None:
+        import importlib.util
+        try:
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError):
+            spec = None
+    return spec
+
+def _normalize_dist_name(name):
+    """规范化发行包名称（不区分大小写，-、_和.视为相同）"""
+    return name.lower().replace("_", "-").replace(".", "-")
+
+def installed_distributions():
+    """
+    一次读取所有已安装发行包的名称和版本
+    
+    返回:
+        规范化的发行包名称到版本号的字典
+    """
+    import importlib.metadata
+    installed = {}
+    for dist in importlib.metadata.distributions():
+        name = dist.metadata["Name"]
+        if name:
+            installed.setdefault(_normalize_dist_name(name), dist.version)
+    return installed
+
+def _installed_version(dist_name, module_name):
+    """读取已安装发行包的版本，没有安装信息时才导入模块读取版本属性"""
+    import importlib.metadata
+    try:
+        return importlib.metadata.version(dist_name)
+    except importlib.metadata.PackageNotFoundError:
+        pass
+    
+    # 没有安装信息（如直接放在路径中的包）时才读取模块的版本属性
+    try:
+        module = _cached_import(module_name)
+    except ImportError:
+        return "未知"
+    version = getattr(module, '__version__', None)
+    return version if isinstance(version, str) else "未知"
+
+def available_top_level_modules():
+    """
+    一次遍历sys.path，列出所有可导入的顶层模块名称
+    
+    返回:
+        模块名称集合
+    """
+    import pkgutil
+    return {sys.intern(module.name) for module in pkgutil.iter_modules()}
+
+def check_dependency(module_name, min_version=None, dist_name=None, installed=None, available=None):
+    """
+    检查依赖项是否已安装
+    
+    只查找模块并读取安装信息，不执行模块代码（cv2、pyautogui等导入时要加载大量动态库）
+    
+    参数:
+        module_name: 模块名称（如cv2）
+        min_version: 最低版本，None则不检查版本
+        dist_name: 发行包名称（如opencv-python），None则与模块名称相同
+        installed: installed_distributions()的结果，提供时直接查表，找不到再查找模块
+        available: available_top_level_modules()的结果，提供时用集合判断模块是否存在，不在集合中才逐个查找
+    """
+    name = dist_name or module_name
+    try:
+        version = installed.get(_normalize_dist_name(name)) if installed is not None else None
+        
+        if available is not None:
+            present = module_name.partition(".")[0] in available or find_module_spec(module_name) is not None
+        else:
+            present = version is not None or find_module_spec(module_name) is not None
+        if not present:
+            raise ImportError(module_name)
+        
+        if version is None:
+            version = _installed_version(name, module_name)
+        
+        if min_version and version != "未知":
+            if isinstance(min_version, str):
+                min_version = parse_version(min_version)
+            parsed = parse_version(version)
+            if parsed is not None and min_version is not None and parsed < min_version:
+                if isinstance(min_version, tuple):
+                    min_version = ".".join(str(part) for part in min_version)
+                return CheckResult(False, f"{name} 版本 {version} 低于最低要求 {min_version}")
+        
+        return CheckResult(True, f"{name} 已安装 (版本: {version})")
+    except ImportError:
+        return CheckResult(False, f"{name} 未安装")
+
+# 核心模块
+CORE_MODULES = (
+    "src.screen_capture",
+    "src.event_recorder",
+    "src.event_player",
+    "src.image_recognition",
+    "src.gui",
+)
+
+def check_core_module(module_name):
+    """
+    检查单个核心模块是否可用
+    
+    只查找模块而不执行模块代码（image_recognition、gui等会加载cv2和GUI库），
+    模块依赖的第三方库由依赖项检查负责
+    """
+    try:
+        if find_module_spec(module_name) is None:
+            return CheckResult(False, f"{module_name} 导入失败: 未找到模块")
+        return CheckResult(True, f"{module_name} 可用")
+    except (ImportError, ValueError) as e:
+        return CheckResult(False, f"{module_name} 导入失败: {str(e)}")
+
+def check_core_modules(executor=None):
+    """
+    检查核心模块是否可用
+    
+    参数:
+        executor: 用于并行检查的线程池，None则依次检查
+    """
+    if executor is None:
+        return [check_core_module(module_name) for module_name in CORE_MODULES]
+    return list(executor.map(check_core_module, CORE_MODULES))
+
+def check_tesseract():
+    """检查Tesseract OCR是否已安装"""
+    import shutil
+    
+    # 先在PATH中查找可执行文件，找不到时不必再导入pytesseract
+    executable = shutil.which("tesseract")
+    if not executable:
+        return CheckResult(False, "Tesseract OCR 未正确安装或未添加到PATH")
+    
+    import subprocess
+    try:
+        result = subprocess.run([executable, "--version"], capture_output=True, text=True, timeout=10)
+        # 旧版本把版本信息输出到stderr
+        output = (result.stdout or result.stderr).strip()
+        first_line = output.splitlines()[0] if output else ""
+        version = first_line.split()[-1] if first_line else "未知"
+        return CheckResult(True, f"Tesseract OCR 已安装 (版本: {version})")
+    except Exception:
+        return CheckResult(False, "Tesseract OCR 未正确安装或未添加到PATH")
+
+def main():
+    """主函数"""
+    import platform
+    import struct
+    from concurrent.futures import ThreadPoolExecutor
+    
+    # 各项检查主要耗时在查找文件和启动tesseract进程上，并行执行，结果仍按固定顺序输出
+    import importlib
+    
+    # 新安装的包也要能被查找到，清空一次查找缓存后所有检查共用
+    importlib.invalidate_caches()
+    executor = ThreadPoolExecutor(max_workers=8)
+    installed = installed_distributions()
+    available = available_top_level_modules()
+    dependency_futures = [
+        executor.submit(check_dependency, module_name, min_version, dist_name, installed, available)
+        for dist_name, module_name, min_version in DEPENDENCIES
+    ]
+    tesseract_future = executor.submit(check_tesseract)
+    core_module_futures = [executor.submit(check_core_module, module_name) for module_name in CORE_MODULES]
+    
+    # 报告先收集到列表中，最后一次写出
+    out = []
+    out.append("=" * 50)
+    out.append("游戏自动化脚本工具 - 安装测试")
+    out.append("=" * 50)
+    
+    # 检查系统信息
+    out.append("\n系统信息:")
+    # platform.uname()只调用一次；位数由指针大小得出，platform.architecture()在非Windows系统上会启动file命令
+    uname = platform.uname()
+    out.append(f"操作系统: {uname.system} {uname.release} ({struct.calcsize('P') * 8}bit)")
+    out.append(f"Python版本: {platform.python_version()}")
+    
+    # 检查依赖项
+    out.append("\n检查依赖项:")
+    all_deps_installed = True
+    for future in dependency_futures:
+        result = future.result()
+        out.append(f"{'✓' if result.ok else '✗'} {result.message}")
+        if not result.ok:
+            all_deps_installed = False
+    
+    # 检查Tesseract OCR
+    out.append("\n检查Tesseract OCR:")
+    result = tesseract_future.result()
+    out.append(f"{'✓' if result.ok else '✗'} {result.message}")
+    
+    # 检查核心模块
+    out.append("\n检查核心模块:")
+    all_modules_available = True
+    for future in core_module_futures:
+        result = future.result()
+        out.append(f"{'✓' if result.ok else '✗'} {result.message}")
+        if not result.ok:
+            all_modules_available = False
+    executor.shutdown()
+    
+    # 总结
+    out.append("\n" + "=" * 50)
+    if all_deps_installed and all_modules_available:
+        out.append("✓ 所有检查通过！游戏自动化脚本工具已正确安装。")
+    else:
+        out.append("✗ 检查未通过。请解决上述问题后再使用游戏自动化脚本工具。")
+    out.append("=" * 50)
+    
+    sys.stdout.write("\n".join(out) + "\n")
@@ -0,0 +1,4 @@
+#!/bin/sh
+# 运行安装测试
+cd "$(dirname "$0")/.." || exit 1
+exec "${PYTHON:-python}" tests/test_installation.py "$@"
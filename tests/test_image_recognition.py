@@ -0,0 +1,197 @@
+"""
+图像识别测试
+
+验证金字塔匹配和共享积分图的多模板匹配与OpenCV全图匹配的结果一致；
+未安装OpenCV等依赖时跳过
+"""
+
+import os
+import sys
+import unittest
+
+# 图像识别模块按顶层模块导入config，需要将src目录加入系统路径
+SRC_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_ROOT not in sys.path:
+    sys.path.insert(0, SRC_ROOT)
+
+try:
+    import cv2
+    import numpy as np
+    from image_recognition import ImageRecognition
+except ImportError as e:
+    cv2 = np = ImageRecognition = None
+    IMPORT_ERROR = str(e)
+else:
+    IMPORT_ERROR = None
+
+
+def smooth_texture(rng, shape, sigma, low, high):
+    """
+    生成平滑的随机纹理，缩小后仍保留主要结构
+
+    参数:
+        rng: 随机数生成器
+        shape: 图像形状 (height, width)
+        sigma: 高斯模糊的标准差
+        low: 最小像素值
+        high: 最大像素值
+
+    返回:
+        uint8灰度图像
+    """
+    noise = cv2.GaussianBlur(rng.standard_normal(shape).astype(np.float32), (0, 0), sigma)
+    noise -= noise.min()
+    noise /= max(float(noise.max()), 1e-6)
+    return (low + noise * (high - low)).astype(np.uint8)
+
+
+@unittest.skipIf(IMPORT_ERROR is not None, f"缺少依赖: {IMPORT_ERROR}")
+class PyramidMatchTest(unittest.TestCase):
+    """金字塔匹配测试"""
+
+    def setUp(self):
+        self.recognition = ImageRecognition()
+        self.recognition.debug_mode = False
+        self.recognition.match_grayscale = True
+        self.recognition.pyramid_levels = 2
+        self.recognition.pyramid_min_template_size = 8
+        self.rng = np.random.default_rng(1128)
+
+    def test_finds_exact_template_among_coarse_distractor(self):
+        """缩小后与模板几乎相同的干扰图案不能挡住原图上的真实匹配"""
+        tpl = smooth_texture(self.rng, (64, 64), 3, 70, 180)
+        scene = smooth_texture(self.rng, (240, 320), 6, 110, 140)
+
+        # 干扰图案为模板叠加奈奎斯特频率的棋盘格，pyrDown后棋盘格被滤除，原图上相关性却很低
+        checker = np.indices(tpl.shape).sum(axis=0) % 2 * 120 - 60
+        distractor = (tpl.astype(np.int16) + checker).astype(np.uint8)
+        scene[32:96, 32:96] = distractor
+
+        # 真实位置取奇数坐标，缩小后与采样网格不对齐
+        scene[137:201, 201:265] = tpl
+
+        self.assertEqual(self.recognition.find_template(scene, tpl, 0.9), (201, 137, 64, 64))
+
+    def test_matches_full_resolution_search(self):
+        """金字塔匹配的位置与cv2.matchTemplate全图匹配一致"""
+        scene = smooth_texture(self.rng, (240, 320), 2, 0, 255)
+        tpl = scene[91:139, 157:221].copy()
+
+        result = cv2.matchTemplate(scene, tpl, cv2.TM_CCOEFF_NORMED)
+        _, _, _, expected = cv2.minMaxLoc(result)
+
+        match = self.recognition.find_template(scene, tpl, 0.9)
+        self.assertIsNotNone(match)
+        self.assertEqual(match[:2], expected)
+
+
+@unittest.skipIf(IMPORT_ERROR is not None, f"缺少依赖: {IMPORT_ERROR}")
+class AnyTemplateMatchTest(unittest.TestCase):
+    """多模板匹配测试"""
+
+    def setUp(self):
+        self.recognition = ImageRecognition()
+        self.recognition.debug_mode = False
+        self.recognition.flat_stddev_threshold = 0
+        self.rng = np.random.default_rng(1128)
+
+    def test_integral_scores_match_opencv(self):
+        """由积分图归一化的得分与cv2.TM_CCOEFF_NORMED一致（灰度和彩色）"""
+        for channels in (1, 3):
+            shape = (120, 160) if channels == 1 else (120, 160, 3)
+            scene = self.rng.integers(0, 256, shape, dtype=np.uint8)
+            tpl = scene[40:72, 50:98].copy()
+
+            integrals = cv2.integral2(scene, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+            result = self.recognition._match_with_integrals(scene, tpl, *integrals)
+            expected = cv2.matchTemplate(scene, tpl, cv2.TM_CCOEFF_NORMED)
+
+            self.assertEqual(result.shape, expected.shape)
+            np.testing.assert_allclose(result, expected, atol=1e-3)
+
+    def test_matches_single_template_search(self):
+        """每个模板的匹配结果与cv2.matchTemplate全图匹配的位置一致，找不到的模板为None"""
+        self.recognition.pyramid_levels = 0
+        scene = self.rng.integers(0, 256, (120, 160), dtype=np.uint8)
+        templates = [scene[10:30, 20:44].copy(), scene[70:110, 100:150].copy(),
+                     self.rng.integers(0, 256, (24, 24), dtype=np.uint8)]
+
+        matches = self.recognition.find_any_template(scene, templates, 0.9)
+
+        for tpl, match in zip(templates[:2], matches[:2]):
+            result = cv2.matchTemplate(scene, tpl, cv2.TM_CCOEFF_NORMED)
+            _, _, _, expected = cv2.minMaxLoc(result)
+            self.assertEqual(match, (expected[0], expected[1], tpl.shape[1], tpl.shape[0]))
+        self.assertIsNone(matches[2])
+
+
+@unittest.skipIf(IMPORT_ERROR is not None, f"缺少依赖: {IMPORT_ERROR}")
+class FftMatchTest(unittest.TestCase):
+    """频域匹配测试"""
+
+    def setUp(self):
+        self.recognition = ImageRecognition()
+        self.recognition.debug_mode = False
+        self.recognition.match_grayscale = True
+        self.recognition.flat_stddev_threshold = 0
+        self.recognition.pyramid_levels = 0
+        self.recognition.fft_min_template_size = 64
+        self.rng = np.random.default_rng(1128)
+
+    def test_fft_scores_match_opencv(self):
+        """频域计算的得分与cv2.TM_CCOEFF_NORMED一致"""
+        scene = self.rng.integers(0, 256, (200, 260), dtype=np.uint8)
+        tpl = scene[50:130, 90:170].copy()
+
+        result = self.recognition._match_with_fft(scene, tpl, None)
+        expected = cv2.matchTemplate(scene, tpl, cv2.TM_CCOEFF_NORMED)
+
+        self.assertEqual(result.shape, expected.shape)
+        np.testing.assert_allclose(result, expected, atol=1e-3)
+
+    def test_large_template_search(self):
+        """不使用金字塔时，大模板经频域匹配找到的位置与cv2.matchTemplate一致"""
+        scene = self.rng.integers(0, 256, (200, 260), dtype=np.uint8)
+        tpl = scene[33:113, 71:151].copy()
+
+        result = cv2.matchTemplate(scene, tpl, cv2.TM_CCOEFF_NORMED)
+        _, _, _, expected = cv2.minMaxLoc(result)
+
+        self.assertEqual(self.recognition.find_template(scene, tpl, 0.9), (expected[0], expected[1], 80, 80))
+
+
+
+@unittest.skipIf(IMPORT_ERROR is not None, f"缺少依赖: {IMPORT_ERROR}")
+class FrameCacheTest(unittest.TestCase):
+    """模板匹配结果缓存测试"""
+
+    def setUp(self):
+        self.recognition = ImageRecognition()
+        self.recognition.debug_mode = False
+        self.recognition.frame_cache_size = 64
+        self.rng = np.random.default_rng(1128)
+        self.scene = self.rng.integers(0, 256, (240, 320), dtype=np.uint8)
+
+    def test_list_region(self):
+        """从JSON读取的列表区域与元组区域结果相同"""
+        self.recognition.add_template('button', self.scene[100:150, 200:260].copy())
+
+        expected = self.recognition.find_template(self.scene, 'button', 0.9, (150, 50, 150, 150))
+        self.assertEqual(expected, (200, 100, 60, 50))
+
+        self.recognition._frame_cache.clear()
+        self.assertEqual(self.recognition.find_template(self.scene, 'button', 0.9, [150, 50, 150, 150]), expected)
+
+
+    def test_change_between_sampled_pixels(self):
+        """画面只在抽样间隔之间的像素发生变化时，不能返回缓存的旧结果"""
+        tpl = self.rng.integers(0, 256, (7, 7), dtype=np.uint8)
+        self.recognition.add_template('icon', tpl)
+        self.assertIsNone(self.recognition.find_template(self.scene, 'icon', 0.9))
+
+        self.scene[201:208, 201:208] = tpl
+        self.assertEqual(self.recognition.find_template(self.scene, 'icon', 0.9), (201, 201, 7, 7))
+
+
+if __name__ == '__main__':
+    unittest.main()